@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Картинки, загруженные тестами, и их миниатюры не остаются
+    в yatube/media."""
+    settings.MEDIA_ROOT = str(tmp_path)
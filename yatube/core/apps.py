@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.models.signals import post_delete, post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import check_connections
+        from .replicas import note_write
+
+        request_started.connect(
+            check_connections, dispatch_uid='core.db.check_connections')
+        post_save.connect(note_write, dispatch_uid='core.replicas.save')
+        post_delete.connect(note_write, dispatch_uid='core.replicas.delete')
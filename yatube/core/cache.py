@@ -0,0 +1,55 @@
+"""Настройки кеша из строки подключения CACHE_URL.
+
+locmem://               — кеш в памяти процесса (по умолчанию);
+redis://host:6379/0     — общий для всех воркеров Redis (django-redis);
+memcached://host:11211  — общий Memcached (python-memcached);
+fakeredis://            — Redis в памяти процесса, для тестов.
+
+Общие бэкенды настроены так, что недоступный сервер кеша
+не роняет запросы: чтение возвращает промах, запись теряется.
+"""
+from urllib.parse import urlsplit
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+REDIS_OPTIONS = {
+    'IGNORE_EXCEPTIONS': True,
+    'SOCKET_CONNECT_TIMEOUT': 0.5,
+    'SOCKET_TIMEOUT': 0.5,
+}
+
+
+def cache_settings(url, key_prefix=''):
+    """Значение CACHES для строки подключения."""
+    parts = urlsplit(url)
+    config = {'KEY_PREFIX': key_prefix}
+    if parts.scheme == 'locmem':
+        config.update(
+            BACKEND='django.core.cache.backends.locmem.LocMemCache',
+            LOCATION=parts.netloc,
+        )
+    elif parts.scheme in ('redis', 'rediss'):
+        config.update(
+            BACKEND='django_redis.cache.RedisCache',
+            LOCATION=url,
+            OPTIONS=dict(REDIS_OPTIONS),
+        )
+    elif parts.scheme == 'memcached':
+        config.update(
+            BACKEND='django.core.cache.backends.memcached.MemcachedCache',
+            LOCATION=parts.netloc.split(','),
+        )
+    elif parts.scheme == 'fakeredis':
+        import fakeredis
+        config.update(
+            BACKEND='django_redis.cache.RedisCache',
+            LOCATION='redis://localhost:6379/0',
+            OPTIONS=dict(REDIS_OPTIONS, CONNECTION_POOL_KWARGS={
+                'connection_class': fakeredis.FakeConnection,
+                'server': fakeredis.FakeServer(),
+            }),
+        )
+    else:
+        raise ImproperlyConfigured(f'Неизвестный CACHE_URL: {url}')
+    return {'default': config}
@@ -0,0 +1,44 @@
+"""Хранилище ключей sorl-thumbnail в общем кеше Django.
+
+Стандартное хранилище sorl держит записи в таблице thumbnail_kvstore
+и при промахе кеша идёт в базу за каждой миниатюрой. Здесь записи
+живут только в кеше THUMBNAIL_CACHE (при Redis — общем для всех
+воркеров), а get_many() достаёт миниатюры всей страницы одним
+запросом. Потерянная запись не страшна: get_thumbnail() найдёт
+готовый файл в хранилище и запишет её заново.
+"""
+from django.core.cache import caches
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.images import deserialize_image_file
+from sorl.thumbnail.kvstores.base import KVStoreBase, add_prefix
+
+
+class CacheKVStore(KVStoreBase):
+    @property
+    def cache(self):
+        return caches[settings.THUMBNAIL_CACHE]
+
+    def get_many(self, image_files):
+        """{ключ: ImageFile} для найденных записей, одним запросом."""
+        keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+        found = self.cache.get_many(list(keys))
+        return {keys[key]: deserialize_image_file(value)
+                for key, value in found.items() if value}
+
+    def _get_raw(self, key):
+        return self.cache.get(key)
+
+    def _set_raw(self, key, value):
+        self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+
+    def _delete_raw(self, *keys):
+        self.cache.delete_many(keys)
+
+    def _find_keys_raw(self, prefix):
+        """Перечислять ключи умеет только django-redis; с другими
+        кешами cleanup() и clear() ничего не находят."""
+        keys = getattr(self.cache, 'keys', None)
+        if keys is None:
+            return []
+        return keys(f'{prefix}*')
@@ -0,0 +1,60 @@
+import logging
+import os
+
+from django.template import Engine, TemplateDoesNotExist, TemplateSyntaxError
+from django.template.loaders.cached import Loader as CachedLoader
+from django.template.utils import get_app_template_dirs
+
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def template_loaders(cached):
+    """Загрузчики шаблонов для OPTIONS['loaders'].
+
+    С cached=True скомпилированные шаблоны хранятся в памяти процесса,
+    и base.html, include-шаблоны и пагинатор не читаются с диска
+    и не разбираются на каждом запросе.
+    """
+    loaders = [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]
+    if cached:
+        return [('django.template.loaders.cached.Loader', loaders)]
+    return loaders
+
+
+def template_names(engine):
+    dirs = list(engine.dirs) + list(get_app_template_dirs('templates'))
+    names = set()
+    for directory in dirs:
+        for root, _, files in os.walk(directory):
+            names.update(
+                os.path.relpath(os.path.join(root, name), directory)
+                for name in files if name.endswith(TEMPLATE_EXTENSIONS)
+            )
+    return sorted(names)
+
+
+def warm_up(engine=None):
+    """Заранее компилирует все шаблоны в кеш загрузчика.
+
+    Вызывается при старте процесса, чтобы первые запросы не платили
+    за разбор шаблонов. Без кеширующего загрузчика ничего не делает.
+    """
+    engine = engine or Engine.get_default()
+    if not any(isinstance(loader, CachedLoader)
+               for loader in engine.template_loaders):
+        return 0
+    compiled = 0
+    for name in template_names(engine):
+        try:
+            engine.get_template(name)
+        except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+            logger.warning('Шаблон %s не скомпилирован: %s', name, error)
+        else:
+            compiled += 1
+    return compiled
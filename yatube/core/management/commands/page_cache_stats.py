@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from core.pagecache import page_cache_stats, reset_page_cache_stats
+
+
+class Command(BaseCommand):
+    help = ('Попадания и промахи кеша страниц для анонимов с последнего '
+            'сброса (--reset).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true',
+                            help='Обнулить счётчики после вывода.')
+
+    def handle(self, *args, **options):
+        hits, misses = page_cache_stats()
+        total = hits + misses
+        ratio = hits / total if total else 0
+        self.stdout.write(
+            f'Попаданий: {hits}, промахов: {misses}, '
+            f'доля попаданий: {ratio:.1%}')
+        if options['reset']:
+            reset_page_cache_stats()
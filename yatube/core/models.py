@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, router, transaction
 
 
 class CreatedModel(models.Model):
@@ -10,3 +10,17 @@ class CreatedModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class AtomicSaveModel(models.Model):
+    """Абстрактная модель. Сохраняет запись в одной транзакции
+    с обработчиками post_save, которые обновляют счётчики."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(
+            type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
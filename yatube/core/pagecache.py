@@ -0,0 +1,213 @@
+"""Кеш целых страниц, общий для всех посетителей.
+
+PageCacheMiddleware отдаёт GET-запросы прямо из кеша, не доходя
+до view, ORM и шаблонов. Сохраняются только ответы view, которые
+вызвали tag_page(): ключ — адрес страницы с параметрами из
+PAGE_PARAMS, а рядом хранятся версии её тегов (пост, группа, автор,
+лента). bump_tags() при изменении модели сдвигает версии, и все
+страницы с этими тегами перестают отдаваться из кеша. Попадания
+и промахи считаются в том же кеше (page_cache_stats).
+
+Реплики получают изменения с задержкой до REPLICA_MAX_LAG секунд.
+Всё это время запросы, читающие с реплики, не сохраняют в кеш то, что
+зависит от сдвинутых тегов (lagging_tags()): иначе под новой версией
+легли бы старые строки.
+
+Всё, что зависит от пользователя (шапка, кнопка подписки, форма
+комментария с CSRF-токеном), выводится тегом {% hole %}: в страницу
+для кеша попадает подписанная метка, а фрагмент рендерится для
+текущего пользователя при каждом ответе, как Edge Side Includes.
+"""
+import hashlib
+import re
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import patch_cache_control, patch_vary_headers
+
+from .replicas import PIN_COOKIE, reading_replica
+
+
+CACHE_METHODS = ('GET', 'HEAD')
+STATS_KEYS = {'hits': 'page-cache:hits', 'misses': 'page-cache:misses'}
+HOLE_SALT = 'core.pagecache.hole'
+HOLE_RE = re.compile(rb'<!--hole:([\w:.-]+)-->')
+# Параметры, которые читают кешируемые view. Остальные (utm-метки
+# и прочее) на страницу не влияют и не дробят кеш на копии; view,
+# которой нужен другой параметр, должна добавить его сюда.
+PAGE_PARAMS = ('page', 'cursor', 'date', 'comments')
+
+
+def version_key(tag):
+    return f'tag-version:{tag}'
+
+
+def lag_key(tag):
+    return f'tag-lag:{tag}'
+
+
+def tag_versions(tags):
+    """{тег: текущая версия}; тегу без версии она заводится."""
+    keys = {version_key(tag): tag for tag in tags}
+    versions = cache.get_many(list(keys))
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return {tag: versions[key] for key, tag in keys.items()}
+
+
+def bump_tags(tags):
+    for tag in tags:
+        try:
+            cache.incr(version_key(tag))
+        except ValueError:
+            pass
+    if settings.DATABASE_REPLICAS:
+        cache.set_many({lag_key(tag): 1 for tag in tags},
+                       settings.REPLICA_MAX_LAG)
+
+
+def lagging_tags(tags):
+    """Запрос читает с реплики, а какой-то из тегов сдвинут меньше
+    REPLICA_MAX_LAG секунд назад: реплика могла ещё не догнать."""
+    return reading_replica() and bool(
+        cache.get_many([lag_key(tag) for tag in tags]))
+
+
+def tag_page(request, *tags):
+    """Разрешает положить ответ на request в кеш страниц с тегами tags.
+
+    Версии запоминаются сразу, до выборки данных страницы: если
+    данные поменяются, пока она рендерится, запись будет устаревшей
+    с самого начала, а не отдаваться до следующего изменения.
+    """
+    page_tags = getattr(request, 'page_tags', None)
+    if page_tags is None:
+        return
+    page_tags.update(tag_versions(tags))
+
+
+def caching_page(request):
+    """Страница запроса уйдёт в кеш: view вызвала tag_page()."""
+    return bool(getattr(request, 'page_tags', None))
+
+
+def hole_marker(template_name, values):
+    """Метка на месте фрагмента; подпись не даёт подставить чужую."""
+    token = signing.dumps([template_name, values], salt=HOLE_SALT)
+    return f'<!--hole:{token}-->'
+
+
+def fill_holes(content, request):
+    """Рендерит вместо меток фрагменты для пользователя request.
+
+    Метка с чужой подписью (например, после смены SECRET_KEY)
+    поднимает signing.BadSignature.
+    """
+    def render(match):
+        template_name, values = signing.loads(
+            match.group(1).decode(), salt=HOLE_SALT)
+        return render_to_string(
+            template_name, values, request=request).encode()
+
+    return HOLE_RE.sub(render, content)
+
+
+def page_key(request):
+    params = urlencode([(name, value) for name in PAGE_PARAMS
+                        for value in request.GET.getlist(name)])
+    uri = f'{request.build_absolute_uri(request.path)}?{params}'.encode()
+    return f'page:{hashlib.md5(uri).hexdigest()}'
+
+
+def count(stat):
+    key = STATS_KEYS[stat]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def page_cache_stats():
+    """(попадания, промахи) по страницам, которые можно кешировать."""
+    stats = cache.get_many(list(STATS_KEYS.values()))
+    return tuple(stats.get(key, 0) for key in STATS_KEYS.values())
+
+
+def reset_page_cache_stats():
+    cache.delete_many(list(STATS_KEYS.values()))
+
+
+class PageCacheMiddleware:
+    """Включается настройкой PAGE_CACHE; в разработке и тестах
+    выключен, потому что тесты читают response.context.
+
+    Стоит после AuthenticationMiddleware: фрагментам нужны
+    request.user и CSRF-токен.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PAGE_CACHE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.bypass_cookies = (CookieStorage.cookie_name, PIN_COOKIE)
+
+    def __call__(self, request):
+        if (request.method not in CACHE_METHODS
+                or any(name in request.COOKIES
+                       for name in self.bypass_cookies)):
+            return self.get_response(request)
+        key = page_key(request)
+        entry = cache.get(key)
+        if entry is not None and tag_versions(entry['tags']) == entry['tags']:
+            response = HttpResponse(entry['content'])
+            for header, value in entry['headers']:
+                response[header] = value
+            try:
+                response = self.finish(request, response, 'hit')
+            except signing.BadSignature:
+                # Страница подписана прежним ключом: это промах,
+                # и её запись перепишется свежей.
+                pass
+            else:
+                count('hits')
+                return response
+        request.page_tags = {}
+        response = self.get_response(request)
+        if not caching_page(request):
+            return response
+        count('misses')
+        if (response.status_code == 200 and not response.streaming
+                and not response.cookies
+                and not lagging_tags(request.page_tags)):
+            cache.set(key, {
+                'tags': request.page_tags,
+                'content': response.content,
+                'headers': list(response.items()),
+            }, settings.PAGE_CACHE_TTL)
+        return self.finish(request, response, 'miss')
+
+    def finish(self, request, response, outcome):
+        """Заполняет дыры для пользователя запроса.
+
+        Страница анонима одинакова для всех анонимов, и браузеры
+        и прокси могут хранить её PAGE_CACHE_MAX_AGE секунд; страница
+        вошедшего пользователя — только его браузер.
+        """
+        response.content = fill_holes(response.content, request)
+        patch_vary_headers(response, ['Cookie'])
+        if request.user.is_authenticated:
+            patch_cache_control(response, private=True)
+        else:
+            patch_cache_control(response, public=True,
+                                max_age=settings.PAGE_CACHE_MAX_AGE)
+        response['X-Page-Cache'] = outcome
+        return response
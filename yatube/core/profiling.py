@@ -0,0 +1,95 @@
+"""Профилирование рендера шаблонов.
+
+TemplateProfilerMiddleware замеряет, сколько миллисекунд ушло на
+каждый шаблон запроса, включая {% include %} и родителей
+{% extends %}, и отдаёт итог в заголовке Server-Timing (его видно
+в инструментах разработчика браузера) и в логгер core.profiling.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.template.base import Template
+
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+class TemplateTiming:
+    __slots__ = ('name', 'calls', 'total', 'own')
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total = 0.0
+        self.own = 0.0
+
+
+def profiled_render(render):
+    def _render(self, context):
+        stack = getattr(_state, 'stack', None)
+        if stack is None:
+            return render(self, context)
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            name = self.origin.template_name or self.origin.name
+            timing = _state.timings.get(name)
+            if timing is None:
+                timing = _state.timings[name] = TemplateTiming(name)
+            timing.calls += 1
+            timing.total += elapsed
+            timing.own += elapsed - children
+
+    _render.profiled = True
+    return _render
+
+
+def install():
+    """Оборачивает Template._render, через который идут все шаблоны."""
+    if not getattr(Template._render, 'profiled', False):
+        Template._render = profiled_render(Template._render)
+
+
+class TemplateProfilerMiddleware:
+    """Включается настройкой TEMPLATE_PROFILING."""
+
+    def __init__(self, get_response):
+        if not settings.TEMPLATE_PROFILING:
+            raise MiddlewareNotUsed
+        install()
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.stack = []
+        _state.timings = OrderedDict()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = list(_state.timings.values())
+            _state.stack = _state.timings = None
+        if timings:
+            response['Server-Timing'] = ', '.join(
+                f'tpl{number};dur={timing.own * 1000:.2f};'
+                f'desc="{timing.name} x{timing.calls}"'
+                for number, timing in enumerate(timings)
+            )
+            logger.debug(
+                'Шаблоны %s: %s', request.path, '; '.join(
+                    f'{timing.name} x{timing.calls}: '
+                    f'{timing.total * 1000:.2f} мс '
+                    f'(свои {timing.own * 1000:.2f} мс)'
+                    for timing in timings
+                ))
+        return response
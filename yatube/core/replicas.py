@@ -0,0 +1,92 @@
+"""Чтение с реплик базы данных.
+
+Запросы view, помеченных @replica_reads, читают со случайной реплики
+из DATABASE_REPLICAS; всё остальное и любые записи идут в основную
+базу. Пользователь, который только что что-то записал, получает
+cookie и REPLICA_PIN_SECONDS секунд читает только из основной базы,
+чтобы видеть свои изменения, пока они не доехали до реплик. Записи
+по ходу чтения (счётчики лент, заведённые при первом обращении) в
+GET-запросах к view с @replica_reads пользователя не закрепляют.
+"""
+import random
+import threading
+from functools import wraps
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+
+
+def replica_reads(view):
+    """Помечает view, которой можно читать с реплики."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+
+    wrapper.replica_reads = True
+    return wrapper
+
+
+def reading_replica():
+    """Запрос читает с реплики, которая может отставать."""
+    return bool(getattr(_state, 'reads', False)
+                and settings.DATABASE_REPLICAS)
+
+
+def note_write(sender, **kwargs):
+    """Приёмник post_save и post_delete: в запросе была запись."""
+    if not getattr(_state, 'reading', False):
+        _state.wrote = True
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(_state, 'reads', False) and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        instance = hints.get('instance')
+        if (instance is not None
+                and instance._state.db in settings.DATABASE_REPLICAS):
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.reading = _state.reads = _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.reading = _state.reads = _state.wrote = False
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _state.reading = (
+            getattr(view_func, 'replica_reads', False)
+            and request.method in SAFE_METHODS
+        )
+        _state.reads = _state.reading and PIN_COOKIE not in request.COOKIES
@@ -0,0 +1,51 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.dispatch import Signal
+from django.utils.deconstruct import deconstructible
+
+
+# Отправляется до проверки, есть ли уже такой файл: приёмник успевает
+# отметить, что файл снова нужен, пока сборщик его не удалил.
+before_save = Signal(providing_args=['name'])
+
+
+@deconstructible
+class HashedFileSystemStorage(FileSystemStorage):
+    """Хранилище, где имя файла — хеш его содержимого.
+
+    Одинаковые файлы попадают в одно место: повторная загрузка
+    ничего не пишет на диск и возвращает имя уже сохранённого файла,
+    а миниатюры sorl-thumbnail, привязанные к имени, общие для всех
+    его владельцев. Удалять такие файлы можно только когда на них
+    больше никто не ссылается.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        hexdigest = digest.hexdigest()
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            os.path.dirname(name), hexdigest[:2], hexdigest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        return self._save(self.hashed_name(name, content), content)
+
+    def _save(self, name, content):
+        before_save.send(sender=self.__class__, name=name)
+        if self.exists(name):
+            return name
+        saved = super()._save(name, content)
+        if saved != name:
+            # Тот же файл успела сохранить параллельная загрузка.
+            self.delete(saved)
+        return name
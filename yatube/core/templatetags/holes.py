@@ -0,0 +1,23 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from core.pagecache import caching_page, hole_marker
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **values):
+    """Фрагмент, свой у каждого пользователя.
+
+    В странице, которая уйдёт в кеш, на его месте остаётся метка,
+    и PageCacheMiddleware рендерит template_name с values при каждом
+    ответе; иначе фрагмент рендерится сразу. Шаблону фрагмента
+    доступны только values и переменные контекст-процессоров.
+    """
+    if caching_page(context.get('request')):
+        return mark_safe(hole_marker(template_name, values))
+    fragment = context.template.engine.get_template(template_name)
+    with context.push(**values):
+        return fragment.render(context)
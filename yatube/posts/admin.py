@@ -1,9 +1,48 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+
+from core.paginators import EstimatedCountPaginator
 
 from .models import Group, Post, Comment, Follow
+from .search import terms
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Список без полного COUNT(*) и без <select> по всей таблице."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class LoadedGroupSelect(AutocompleteSelect):
+    """Автокомплит группы, которому можно отдать уже загруженную группу.
+
+    В строках списка постов группа приходит вместе с постом
+    (list_select_related), и выбранный вариант не нужно запрашивать
+    отдельно для каждой строки.
+    """
+    group = None
+
+    def optgroups(self, name, value, attr=None):
+        group = self.group
+        if group is None or [str(v) for v in value] != [str(group.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, group.pk, str(group), {str(group.pk)}, len(options)))
+        return [(None, options, 0)]
+
+
+class PostChangeListForm(forms.ModelForm):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        widget = self.fields['group'].widget
+        getattr(widget, 'widget', widget).group = self.instance.group
 
 
-class PostAdmin(admin.ModelAdmin):
+class PostAdmin(LargeTableAdmin):
     list_display = (
         'pk',
         'text',
@@ -12,12 +51,51 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = LoadedGroupSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по text."""
+        if not terms(search_term):
+            return queryset, False
+        return queryset.filter(search__document__match=search_term), False
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title', 'slug')
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'post', 'author', 'created')
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post', 'author')
+    search_fields = ('=author__username',)
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    search_fields = ('=user__username', '=author__username')
+
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
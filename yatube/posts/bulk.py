@@ -0,0 +1,305 @@
+"""Потоковая выгрузка и загрузка постов, комментариев и подписок.
+
+Записи пишутся и читаются по одной, в JSON Lines (объект на строку)
+или в CSV с заголовком, поэтому память не зависит от размера файла.
+Пользователи и группы указываются по username и slug, посты — по id,
+так что файл переносится между базами. Загрузка идёт пачками через
+bulk_create, каждая пачка в своей транзакции вместе с отметкой
+ImportProgress о числе загруженных записей; сигналы при этом
+не срабатывают, и поисковый индекс и версии лент обновляются
+для пачки сразу, а счётчики и ленты подписок — в finish_import().
+"""
+import csv
+import json
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import search, timeline
+from .caching import bump_feed_versions, post_feeds, post_page
+from .counters import rebuild_counters
+from .models import Comment, Follow, Group, ImportProgress, Post, User
+
+
+FORMATS = ('jsonl', 'csv')
+LOOKUP_CHUNK = 500
+
+
+class BulkError(Exception):
+    """Запись файла нельзя загрузить."""
+
+
+def format_of(path):
+    return 'csv' if path.endswith('.csv') else 'jsonl'
+
+
+def read_records(file, fmt):
+    if fmt == 'csv':
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+class RecordWriter:
+    def __init__(self, file, fmt, fields, header=True):
+        self.file = file
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(file, fields)
+            if header:
+                self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv is not None:
+            self.csv.writerow(record)
+        else:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def optional(value):
+    """Пустая ячейка CSV или null в JSON — нет значения."""
+    return None if value in (None, '') else value
+
+
+def as_date(value, number):
+    value = optional(value)
+    if value is None:
+        return timezone.now()
+    date = parse_datetime(value)
+    if date is None:
+        raise BulkError(f'Запись {number}: дата «{value}» не распознана')
+    return date
+
+
+def as_id(value, number):
+    value = optional(value)
+    try:
+        return None if value is None else int(value)
+    except ValueError:
+        raise BulkError(f'Запись {number}: id «{value}» — не число')
+
+
+def pk_map(model, field, values):
+    """{значение field: pk} для пачки, кусками под лимит параметров."""
+    values = list({value for value in values if value is not None})
+    found = {}
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        found.update(model.objects.filter(**{
+            f'{field}__in': values[start:start + LOOKUP_CHUNK],
+        }).values_list(field, 'pk'))
+    return found
+
+
+def resolve(mapping, value, what, number):
+    if value is None:
+        return None
+    try:
+        return mapping[value]
+    except KeyError:
+        raise BulkError(f'Запись {number}: нет {what} «{value}»')
+
+
+@contextmanager
+def keep_dates(model):
+    """bulk_create не затирает даты из файла: auto_now_add на время
+    загрузки выключается (команда работает в своём процессе)."""
+    fields = [field for field in model._meta.concrete_fields
+              if getattr(field, 'auto_now_add', False)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class PostKind:
+    model = Post
+    fields = ('id', 'author', 'group', 'text', 'pub_date', 'image')
+    columns = ('pk', 'author__username', 'group__slug', 'text',
+               'pub_date', 'image')
+
+    def build(self, batch):
+        users = pk_map(User, 'username',
+                       (optional(record.get('author'))
+                        for number, record in batch))
+        groups = pk_map(Group, 'slug',
+                        (optional(record.get('group'))
+                         for number, record in batch))
+        posts = []
+        for number, record in batch:
+            author_id = resolve(users, optional(record.get('author')),
+                                'пользователя', number)
+            pk = as_id(record.get('id'), number)
+            if pk is None or author_id is None:
+                raise BulkError(f'Запись {number}: нужны id и автор')
+            posts.append(Post(
+                pk=pk,
+                author_id=author_id,
+                group_id=resolve(groups, optional(record.get('group')),
+                                 'группы', number),
+                text=record.get('text') or '',
+                pub_date=as_date(record.get('pub_date'), number),
+                image=optional(record.get('image')) or '',
+            ))
+        return posts
+
+    def loaded(self, posts):
+        search.index_posts((post.pk, post.text) for post in posts)
+        feeds = set()
+        for post in posts:
+            feeds.update(post_feeds(post))
+        bump_feed_versions(feeds)
+
+
+class CommentKind:
+    model = Comment
+    fields = ('id', 'post', 'author', 'text', 'created')
+    columns = ('pk', 'post_id', 'author__username', 'text', 'created')
+
+    def build(self, batch):
+        users = pk_map(User, 'username',
+                       (optional(record.get('author'))
+                        for number, record in batch))
+        return [
+            Comment(
+                pk=as_id(record.get('id'), number),
+                post_id=as_id(record.get('post'), number),
+                author_id=resolve(users, optional(record.get('author')),
+                                  'пользователя', number),
+                text=record.get('text') or '',
+                created=as_date(record.get('created'), number),
+            )
+            for number, record in batch
+        ]
+
+    def loaded(self, comments):
+        bump_feed_versions({post_page(comment.post_id)
+                            for comment in comments})
+
+
+class FollowKind:
+    model = Follow
+    fields = ('id', 'user', 'author')
+    columns = ('pk', 'user__username', 'author__username')
+
+    def build(self, batch):
+        users = pk_map(User, 'username', (
+            optional(record.get(field))
+            for number, record in batch for field in ('user', 'author')))
+        return [
+            Follow(
+                pk=as_id(record.get('id'), number),
+                user_id=resolve(users, optional(record.get('user')),
+                                'пользователя', number),
+                author_id=resolve(users, optional(record.get('author')),
+                                  'пользователя', number),
+            )
+            for number, record in batch
+        ]
+
+    def loaded(self, follows):
+        pass
+
+
+KINDS = {
+    'posts': PostKind(),
+    'comments': CommentKind(),
+    'follows': FollowKind(),
+}
+
+
+def export_records(kind, writer, after=0, chunk_size=2000):
+    """Пишет записи с id больше after по возрастанию id.
+
+    Выборка идёт кусками по ключу id, а не одним курсором: так память
+    постоянна и без серверных курсоров (PgBouncer).
+    Возвращает генератор числа записанных записей после каждого куска.
+    """
+    rows = kind.model.objects.order_by('pk').values_list(*kind.columns)
+    written = 0
+    while True:
+        chunk = list(rows.filter(pk__gt=after)[:chunk_size])
+        if not chunk:
+            return
+        for row in chunk:
+            record = dict(zip(kind.fields, row))
+            for field, value in record.items():
+                if hasattr(value, 'isoformat'):
+                    record[field] = value.isoformat()
+            writer.write(record)
+        written += len(chunk)
+        after = chunk[-1][0]
+        yield written
+
+
+def last_id(records):
+    """id последней записи в уже выгруженном файле."""
+    last = None
+    for last in records:
+        pass
+    return 0 if last is None else as_id(last.get('id'), 0) or 0
+
+
+def loaded_count(progress_key):
+    """Сколько записей загрузки progress_key уже закоммичено."""
+    return ImportProgress.objects.filter(key=progress_key).values_list(
+        'done', flat=True).first() or 0
+
+
+def forget_progress(progress_key):
+    ImportProgress.objects.filter(key=progress_key).delete()
+
+
+def import_records(kind, records, batch_size=1000, skip=0,
+                   progress_key=None):
+    """Загружает записи пачками; skip первых уже загружено.
+
+    Генератор: после коммита каждой пачки отдаёт число загруженных
+    записей. С progress_key это число коммитится вместе с пачкой
+    в ImportProgress, и loaded_count() даёт skip для повторного запуска.
+    """
+    done = skip
+    batch = []
+    for number, record in enumerate(records, 1):
+        if number <= skip:
+            continue
+        batch.append((number, record))
+        if len(batch) == batch_size:
+            done += len(batch)
+            load_batch(kind, batch, progress_key, done)
+            batch = []
+            yield done
+    if batch:
+        done += len(batch)
+        load_batch(kind, batch, progress_key, done)
+        yield done
+
+
+def load_batch(kind, batch, progress_key=None, done=0):
+    with transaction.atomic(), keep_dates(kind.model):
+        objects = kind.model.objects.bulk_create(kind.build(batch))
+        kind.loaded(objects)
+        if progress_key is not None:
+            ImportProgress.objects.update_or_create(
+                key=progress_key, defaults={'done': done})
+
+
+def finish_import(rebuild=True):
+    """Сдвигает последовательности id за загруженные записи и делает то,
+    что при обычном сохранении делают сигналы, для всей базы."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(
+                no_style(), [User, Group, Post, Comment, Follow]):
+            cursor.execute(sql)
+    if not rebuild:
+        return
+    with transaction.atomic():
+        rebuild_counters()
+        timeline.rebuild()
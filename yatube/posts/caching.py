@@ -0,0 +1,62 @@
+"""Версии лент для ключей кеша фрагментов и страниц.
+
+Ключ фрагмента ленты включает её версию; сохранение или удаление
+поста сдвигает версии лент, в которые он входит, и старые
+фрагменты больше не читаются, сколько бы им ни оставалось жить.
+Ленты и страницы постов — это теги core.pagecache, так что те же
+версии сбрасывают и целые страницы в кеше для анонимов.
+
+Версии сдвигаются только после коммита: иначе читатель, увидевший
+новую версию раньше новых строк, положил бы под неё старый фрагмент.
+По той же причине читатель отстающей реплики фрагмент не сохраняет
+(core.pagecache.lagging_tags).
+"""
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+
+from core.pagecache import bump_tags, lagging_tags, tag_versions
+
+from .counters import INDEX_FEED, author_feed, group_feed
+
+
+def post_page(post_id):
+    """Тег страницы поста."""
+    return f'post:{post_id}'
+
+
+def feed_cache(feed):
+    """Время жизни и версия фрагмента ленты для {% cache %}.
+
+    Лента подписок зависит и от общей ленты. Пока реплика, с которой
+    читает запрос, может не знать о последних изменениях ленты, время
+    жизни нулевое и фрагмент не сохраняется.
+    """
+    feeds = [feed]
+    if feed.startswith('follow:'):
+        feeds.insert(0, INDEX_FEED)
+    versions = tag_versions(feeds)
+    return {
+        'ttl': 0 if lagging_tags(feeds) else settings.FEED_CACHE_TTL,
+        'version': '.'.join(str(versions[feed]) for feed in feeds),
+    }
+
+
+def bump_feed_versions(feeds, using=None):
+    """Сдвигает версии лент после коммита текущей транзакции."""
+    transaction.on_commit(partial(bump_tags, list(feeds)), using=using)
+
+
+def post_feeds(post, *group_ids):
+    """Ленты, в которых виден пост (с учётом прежних групп)."""
+    feeds = {INDEX_FEED, author_feed(post.author_id)}
+    feeds.update(group_feed(group_id)
+                 for group_id in (post.group_id, *group_ids)
+                 if group_id is not None)
+    return feeds
+
+
+def post_tags(post, *group_ids):
+    """Ленты поста и его страница."""
+    return post_feeds(post, *group_ids) | {post_page(post.pk)}
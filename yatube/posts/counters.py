@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (Comment, FeedCounter, Follow, Group, Post, StoredImage,
+                     User, UserStats)
+
+
+INDEX_FEED = 'index'
+# SQLite вставляет bulk_create одним INSERT … SELECT … UNION ALL,
+# а в нём не больше 500 SELECT (SQLITE_MAX_COMPOUND_SELECT).
+BATCH_SIZE = 500
+
+
+def group_feed(group_id):
+    return f'group:{group_id}'
+
+
+def author_feed(author_id):
+    return f'author:{author_id}'
+
+
+def follow_feed(user_id):
+    return f'follow:{user_id}'
+
+
+def change_counter(queryset, field, delta):
+    """Сдвигает счётчик выражением F(), не уводя его ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_post_counters(post, delta):
+    change_counter(FeedCounter.objects.filter(key=INDEX_FEED), 'value', delta)
+    change_author_counter(post.author_id, delta)
+    change_group_counter(post.group_id, delta)
+
+
+def change_author_counter(author_id, delta):
+    change_counter(
+        UserStats.objects.filter(pk=author_id), 'posts_count', delta)
+
+
+def change_group_counter(group_id, delta):
+    if group_id is not None:
+        change_counter(
+            Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def forget_feed_count(feed):
+    cache.delete(f'feed-count:{feed}')
+
+
+def feed_count(feed, queryset):
+    """Число постов в ленте без агрегата по Post на каждый запрос.
+
+    Общая лента читает FeedCounter, группы и авторы — свои
+    денормализованные счётчики. Остальные ленты считаются честно
+    и кешируются на FEED_COUNT_CACHE_TTL секунд.
+    """
+    kind, _, pk = feed.partition(':')
+    if kind == INDEX_FEED:
+        value = FeedCounter.objects.filter(key=feed).values_list(
+            'value', flat=True).first()
+        if value is None:
+            counter, _ = FeedCounter.objects.get_or_create(
+                key=feed, defaults={'value': queryset.count()})
+            value = counter.value
+        return value
+    if kind == 'group':
+        return Group.objects.values_list(
+            'posts_count', flat=True).get(pk=pk)
+    if kind == 'author':
+        value = UserStats.objects.filter(pk=pk).values_list(
+            'posts_count', flat=True).first()
+        return queryset.count() if value is None else value
+    return cache.get_or_set(
+        f'feed-count:{feed}', queryset.count, settings.FEED_COUNT_CACHE_TTL)
+
+
+def count_of(model, field):
+    """Подзапрос с числом записей model, ссылающихся на строку."""
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    ), 0)
+
+
+def rebuild_counters():
+    """Пересчитывает все денормализованные счётчики с нуля."""
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in User.objects.filter(
+            stats__isnull=True).values_list('pk', flat=True)],
+        batch_size=BATCH_SIZE,
+    )
+    UserStats.objects.update(
+        posts_count=count_of(Post, 'author'),
+        followers_count=count_of(Follow, 'author'),
+        following_count=count_of(Follow, 'user'),
+    )
+    Group.objects.update(posts_count=count_of(Post, 'group'))
+    Post.objects.update(comments_count=count_of(Comment, 'post'))
+    FeedCounter.objects.update_or_create(
+        key=INDEX_FEED, defaults={'value': Post.objects.count()})
+    image_refs = dict(
+        Post.objects.exclude(image='').order_by().values('image')
+        .annotate(refs=Count('pk')).values_list('image', 'refs')
+    )
+    StoredImage.objects.bulk_create(
+        [StoredImage(name=name) for name in image_refs.keys() - set(
+            StoredImage.objects.values_list('name', flat=True))],
+        batch_size=BATCH_SIZE,
+    )
+    for stored in StoredImage.objects.iterator():
+        refs = image_refs.get(stored.name, 0)
+        released = stored.released
+        if refs:
+            released = None
+        elif released is None:
+            released = timezone.now()
+        if (refs, released) != (stored.refs, stored.released):
+            StoredImage.objects.filter(pk=stored.pk).update(
+                refs=refs, released=released)
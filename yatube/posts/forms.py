@@ -1,6 +1,7 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import RejectedUpload, shrink
 
 
 class PostForm(forms.ModelForm):
@@ -12,6 +13,28 @@ class PostForm(forms.ModelForm):
             'group': 'Группа',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = {
+            name: upload.error for name, upload in self.files.items()
+            if isinstance(upload, RejectedUpload)
+        }
+        if self.upload_errors:
+            self.files = self.files.copy()
+            for name in self.upload_errors:
+                del self.files[name]
+
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if image and image is not self.initial.get('image'):
+            image = shrink(image)
+        return image
+
+    def clean(self):
+        for name, error in self.upload_errors.items():
+            self.add_error(name, error)
+        return super().clean()
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,70 @@
+import re
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts.models import Group, UserStats
+
+
+NEXT_RE = re.compile(r'href="\?cursor=([^"]+)">\s*Следующая')
+NO_CACHE = {'default': {
+    'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+}}
+
+
+class Command(BaseCommand):
+    help = ('Меряет время ответа лент на текущей базе (например, после '
+            'seed): первая страница и страница --depth по курсору. '
+            'Кеш отключён, чтобы мерить запросы, а не кеш.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--depth', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        author = UserStats.objects.order_by('-posts_count').first()
+        reader = UserStats.objects.order_by('-following_count').first()
+        group = Group.objects.order_by('-posts_count').first()
+        if author is None or group is None:
+            raise CommandError('База пуста: сначала запустите seed.')
+        client = Client()
+        client.force_login(reader.user)
+        feeds = {
+            'index': reverse('all_posts:index'),
+            'group': reverse('all_posts:group_list', args=[group.slug]),
+            'profile': reverse('all_posts:profile',
+                               args=[author.user.username]),
+            'follow': reverse('all_posts:follow_index'),
+        }
+        self.stdout.write(
+            f"лента    стр. 1, мс  стр. {options['depth']}, мс")
+        with override_settings(CACHES=NO_CACHE):
+            for name, url in feeds.items():
+                first = self.measure(client, url, options['repeat'])
+                deep_url = self.deep_url(client, url, options['depth'])
+                deep = (self.measure(client, deep_url, options['repeat'])
+                        if deep_url else float('nan'))
+                self.stdout.write(f'{name:<7}  {first:>10.1f}  {deep:>12.1f}')
+
+    def measure(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise CommandError(f'{url}: {response.status_code}')
+        return statistics.median(timings)
+
+    def deep_url(self, client, url, depth):
+        """Адрес страницы depth, пройденной по курсорам next."""
+        page_url = url
+        for _ in range(depth - 1):
+            found = NEXT_RE.search(client.get(page_url).content.decode())
+            if found is None:
+                return None
+            page_url = f'{url}?cursor={found.group(1)}'
+        return page_url
@@ -0,0 +1,110 @@
+import io
+import random
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from PIL import Image, ImageDraw, ImageFilter
+from sorl.thumbnail import delete, get_thumbnail
+
+from posts.thumbnails import geometry, image_variants, modern_formats
+
+
+def synthetic_photo(rnd, width, height):
+    """Картинка, по сжимаемости похожая на фотографию с телефона."""
+    image = Image.new('RGB', (width, height))
+    draw = ImageDraw.Draw(image)
+    for _ in range(200):
+        x, y = rnd.randrange(width), rnd.randrange(height)
+        radius = rnd.randrange(width // 40, width // 6)
+        color = tuple(rnd.randrange(256) for _ in range(3))
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=color)
+    image = image.filter(ImageFilter.GaussianBlur(width // 200))
+    noise = Image.effect_noise((width, height), 24).convert('RGB')
+    return Image.blend(image, noise, 0.15)
+
+
+def parse_viewport(value):
+    width, _, ratio = value.partition('@')
+    return int(width), float(ratio or 1)
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает объём картинок на странице ленты: одна миниатюра '
+            '960x339 против srcset в современных форматах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=settings.PAGE_COUNT)
+        parser.add_argument('--source', default='4032x3024',
+                            help='Размер оригиналов, например 4032x3024.')
+        parser.add_argument('--viewport', action='append', type=parse_viewport,
+                            help='Ширина экрана и плотность: 390@3, 1280@1.')
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        viewports = options['viewport'] or [(390, 3.0), (768, 2.0),
+                                            (1280, 1.0)]
+        width, height = map(int, options['source'].split('x'))
+        rnd = random.Random(options['seed'])
+        media_root = tempfile.mkdtemp()
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                sources = [
+                    default_storage.save(f'bench/{i}.jpg', ContentFile(
+                        self.encode(synthetic_photo(rnd, width, height))))
+                    for i in range(options['posts'])
+                ]
+                self.report(sources, viewports, width)
+                for source in sources:
+                    delete(source, delete_file=False)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    @staticmethod
+    def encode(image):
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', quality=90)
+        return buffer.getvalue()
+
+    def report(self, sources, viewports, source_width):
+        legacy = {'crop': 'center', 'upscale': True}
+        before = sum(file_size(get_thumbnail(source, geometry(960), **legacy))
+                     for source in sources)
+        best_format = (modern_formats() or ['JPEG'])[0]
+        self.stdout.write(
+            f'Постов на странице: {len(sources)}, формат srcset: '
+            f'{best_format}')
+        self.stdout.write(f'До: {before} байт на любом экране')
+        for css_width, ratio in viewports:
+            needed = min(css_width, settings.POST_IMAGE_DEFAULT_WIDTH) * ratio
+            after = sum(
+                picked_size(source, source_width, best_format, needed)
+                for source in sources)
+            self.stdout.write(
+                f'После, экран {css_width}px@{ratio:g}x: {after} байт '
+                f'({after / before:.0%} от прежнего)')
+
+
+def file_size(thumbnail):
+    return thumbnail.storage.size(thumbnail.name)
+
+
+def picked_size(source, source_width, format_, needed):
+    """Вес варианта, который браузер выберет по srcset и sizes."""
+    candidates = sorted(
+        (thumbnail.width, file_size(thumbnail))
+        for thumbnail in (
+            get_thumbnail(source, geometry_string, **options)
+            for geometry_string, options in image_variants(source_width)
+            if options['format'] == format_
+        )
+    )
+    for width, size in candidates:
+        if width >= needed:
+            return size
+    return candidates[-1][1]
@@ -0,0 +1,102 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+from posts.models import Group, Post, User
+
+
+LEGACY_CARD = '''{% load post_images %}
+<div class="container py-5">
+<div class="row">
+<article>
+<ul>
+<li>
+Автор: {{ post.author.get_full_name }}
+<a href="{% url 'all_posts:profile' post.author %}">все посты пользователя</a>
+</li>
+<li>
+Дата публикации: {{ post.pub_date|date:"d E Y" }}
+</li>
+</ul>
+{% post_image post.image %}
+<p>{{ post.text }}</p>
+<a href="{% url 'all_posts:post_detail' post.pk %}">подробная информация </a>
+</article>
+</div>
+</div>'''
+
+LEGACY_FEED = '''{% for post in posts %}
+{% include 'includes/post_list.html' %}
+{% if post.group %}
+<a href="{% url 'all_posts:group_list' post.group.slug %}">
+все записи группы</a>
+{% endif %}
+{% if not forloop.last %}<hr>{% endif %}
+{% endfor %}'''
+
+CARD_FEED = '''{% load post_cards %}{% for post in posts %}
+{% post_card post group=True %}
+{% if not forloop.last %}<hr>{% endif %}
+{% endfor %}'''
+
+
+def feed_posts(count):
+    """Посты в памяти, без базы и картинок: меряется только шаблон."""
+    groups = [Group(pk=pk, title=f'Группа {pk}', slug=f'group-{pk}')
+              for pk in range(1, 6)]
+    authors = [User(pk=pk, username=f'user{pk}', first_name='Имя',
+                    last_name=f'Фамилия {pk}') for pk in range(1, 21)]
+    now = timezone.now()
+    return [
+        Post(pk=pk, text=f'Текст поста номер {pk}. ' * 5, pub_date=now,
+             author=authors[pk % len(authors)],
+             group=groups[pk % len(groups)] if pk % 3 else None)
+        for pk in range(1, count + 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает рендер ленты через {% include %} на каждый пост '
+            'и через тег post_card.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10, 50, 200])
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--number', type=int, default=20)
+
+    def handle(self, *args, **options):
+        engine = DjangoTemplates({
+            'NAME': 'bench',
+            'DIRS': [],
+            'APP_DIRS': False,
+            'OPTIONS': {'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    ('django.template.loaders.locmem.Loader', {
+                        'includes/post_list.html': LEGACY_CARD,
+                        'legacy_feed.html': LEGACY_FEED,
+                        'card_feed.html': CARD_FEED,
+                    }),
+                ]),
+            ]},
+        })
+        templates = {
+            'include': engine.get_template('legacy_feed.html'),
+            'post_card': engine.get_template('card_feed.html'),
+        }
+        self.stdout.write('постов  include, мс  post_card, мс  ускорение')
+        for size in options['sizes']:
+            context = {'posts': feed_posts(size)}
+            timings = {
+                name: min(timeit.repeat(
+                    lambda: template.render(context),
+                    repeat=options['repeat'], number=options['number'],
+                )) / options['number'] * 1000
+                for name, template in templates.items()
+            }
+            self.stdout.write(
+                f"{size:>6}  {timings['include']:>11.2f}  "
+                f"{timings['post_card']:>13.2f}  "
+                f"{timings['include'] / timings['post_card']:>9.1f}x")
@@ -0,0 +1,102 @@
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from faker.providers.lorem.ru_RU import Provider
+
+from posts.models import Post, PostSearch, User
+from posts.search import rebuild_index
+from posts.utils import CursorPaginator
+
+
+BATCH_SIZE = 10000
+RARE_WORD = 'редкостный'
+
+
+def post_texts(count, seed):
+    """Тексты постов из словаря Faker с частотами по закону Ципфа.
+
+    Каждый десятитысячный пост дополнительно содержит RARE_WORD.
+    """
+    rng = random.Random(seed)
+    words = list(Provider.word_list)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+    for number in range(count):
+        text = rng.choices(words, weights, k=rng.randint(10, 40))
+        if number % 10000 == 0:
+            text.append(RARE_WORD)
+        yield ' '.join(text).capitalize() + '.'
+
+
+def elapsed(func):
+    """Время вызова func в миллисекундах и его результат."""
+    start = time.perf_counter()
+    result = func()
+    return (time.perf_counter() - start) * 1000, result
+
+
+class Command(BaseCommand):
+    help = ('Меряет время поиска по полнотекстовому индексу и LIKE на '
+            'синтетических постах. Посты создаются в транзакции, которая '
+            'в конце откатывается.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=1000000)
+        parser.add_argument('--depth', type=int, default=20,
+                            help='Номер страницы для замера по курсору.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.fill(options['posts'], options['seed'])
+            self.measure(options['depth'])
+            transaction.set_rollback(True)
+
+    def fill(self, count, seed):
+        author = User.objects.create_user(username='bench-search')
+        start = timezone.now()
+        batch = []
+        for number, text in enumerate(post_texts(count, seed)):
+            batch.append(Post(
+                author=author, text=text,
+                pub_date=start - timedelta(seconds=number)))
+            if len(batch) == BATCH_SIZE:
+                Post.objects.bulk_create(batch)
+                batch = []
+        Post.objects.bulk_create(batch)
+        seconds, _ = elapsed(rebuild_index)
+        self.stdout.write(
+            f'Постов: {count}, индекс построен за {seconds / 1000:.1f} с')
+
+    def measure(self, depth):
+        words = Provider.word_list
+        queries = [words[0], words[49], words[-1], RARE_WORD,
+                   f'{words[0]} {words[9]}']
+        self.stdout.write(
+            'запрос                       найдено  стр. 1, мс  '
+            f'стр. {depth}, мс  LIKE, мс')
+        for query in queries:
+            found = Post.objects.feed().search(query)
+            paginator = CursorPaginator(
+                found, settings.PAGE_COUNT, keys=('rank', 'pk'),
+                count_provider=PostSearch.objects.candidates(query).count)
+            first_ms, page = elapsed(lambda: paginator.page(1))
+            for _ in range(depth - 2):
+                if page.next_cursor is None:
+                    break
+                page = paginator.cursor_page(page.next_cursor)
+            deep_ms = None
+            if page.next_cursor is not None:
+                deep_ms, page = elapsed(
+                    lambda: paginator.cursor_page(page.next_cursor))
+            like_ms, _ = elapsed(lambda: list(
+                Post.objects.feed().filter(text__icontains=query.split()[0])
+                .order_by('-pub_date', '-pk')[:settings.PAGE_COUNT]))
+            deep = f'{deep_ms:>12.1f}' if deep_ms is not None else ' ' * 12
+            self.stdout.write(
+                f'{query:<27}  {paginator.count:>7}  {first_ms:>10.1f}  '
+                f'{deep}  {like_ms:>8.1f}')
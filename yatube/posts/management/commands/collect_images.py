@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.media import collect, scan
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы картинок и их миниатюры, '
+            'на которые не ссылается ни один пост.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=int, default=settings.IMAGE_GC_GRACE,
+            help='Сколько секунд файл должен пролежать без ссылок.')
+        parser.add_argument(
+            '--scan', action='store_true',
+            help='Сначала найти на диске файлы, о которых не знает база.')
+
+    def handle(self, *args, **options):
+        if options['scan']:
+            found = scan()
+            self.stdout.write(f'Найдено неучтённых файлов: {found}.')
+        removed = collect(options['grace'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов: {removed}.'))
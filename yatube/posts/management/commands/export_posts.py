@@ -0,0 +1,55 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.bulk import (FORMATS, KINDS, RecordWriter, export_records,
+                        format_of, last_id, read_records)
+
+
+class Command(BaseCommand):
+    help = ('Выгружает посты, комментарии или подписки в JSON Lines или '
+            'CSV по возрастанию id.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл или «-» для stdout.')
+        parser.add_argument('--model', choices=KINDS, default='posts')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Дописать в файл записи после последней выгруженной.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        kind = KINDS[options['model']]
+        fmt = options['format'] or format_of(path)
+        after = 0
+        if path == '-':
+            if options['resume']:
+                raise CommandError('--resume работает только с файлом.')
+            return self.export(kind, sys.stdout, fmt, after, options)
+        if options['resume'] and os.path.exists(path):
+            with open(path, newline='', encoding='utf-8') as file:
+                after = last_id(read_records(file, fmt))
+        mode = 'a' if after else 'w'
+        with open(path, mode, newline='', encoding='utf-8') as file:
+            self.export(kind, file, fmt, after, options)
+
+    def export(self, kind, file, fmt, after, options):
+        writer = RecordWriter(file, fmt, kind.fields, header=not after)
+        start = time.monotonic()
+        written = 0
+        for written in export_records(
+                kind, writer, after, options['chunk_size']):
+            self.report(written, start)
+        self.report(written, start, done=True)
+
+    def report(self, written, start, done=False):
+        rate = written / max(time.monotonic() - start, 1e-9)
+        message = f'Выгружено записей: {written}, {rate:.0f} в секунду'
+        if done:
+            self.stderr.write(self.style.SUCCESS(message))
+        else:
+            self.stderr.write(message, ending='\r')
@@ -0,0 +1,61 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts.bulk import (FORMATS, KINDS, BulkError, finish_import,
+                        forget_progress, format_of, import_records,
+                        loaded_count, read_records)
+
+
+class Command(BaseCommand):
+    help = ('Загружает посты, комментарии или подписки из JSON Lines или '
+            'CSV пачками через bulk_create. Прерванную загрузку можно '
+            'продолжить с --resume.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--model', choices=KINDS, default='posts')
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Пропустить записи, загруженные прошлым запуском.')
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счётчики и ленты подписок (например, '
+                 'если следом загружается ещё один файл).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        kind = KINDS[options['model']]
+        fmt = options['format'] or format_of(path)
+        progress_key = f'{options["model"]}:{os.path.abspath(path)}'
+        skip = loaded_count(progress_key) if options['resume'] else 0
+        start = time.monotonic()
+        done = skip
+        with open(path, newline='', encoding='utf-8') as file:
+            try:
+                for done in import_records(
+                        kind, read_records(file, fmt),
+                        options['batch_size'], skip, progress_key):
+                    self.report(done - skip, start)
+            except (BulkError, IntegrityError, ValueError) as error:
+                raise CommandError(
+                    f'{error}. Загружено записей: {done}; продолжить '
+                    f'можно с --resume.')
+        forget_progress(progress_key)
+        self.report(done - skip, start, done=True)
+        finish_import(rebuild=not options['skip_rebuild'])
+        if not options['skip_rebuild']:
+            self.stderr.write(self.style.SUCCESS(
+                'Счётчики и ленты подписок пересчитаны.'))
+
+    def report(self, loaded, start, done=False):
+        rate = loaded / max(time.monotonic() - start, 1e-9)
+        message = f'Загружено записей: {loaded}, {rate:.0f} в секунду'
+        if done:
+            self.stderr.write(self.style.SUCCESS(message))
+        else:
+            self.stderr.write(message, ending='\r')
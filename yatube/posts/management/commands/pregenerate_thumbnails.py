@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import pregenerate, process_queue
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры картинок: для всех опубликованных постов '
+            'или, с --queue, для картинок из очереди.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Сколько постов читать из базы за раз.')
+        parser.add_argument(
+            '--queue', action='store_true',
+            help='Разобрать очередь картинок, загруженных на сайте.')
+        parser.add_argument(
+            '--watch', type=float, metavar='SECONDS',
+            help='С --queue: не завершаться, а проверять очередь '
+                 'каждые SECONDS секунд.')
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            self.handle_queue(options['chunk_size'], options['watch'])
+            return
+        posts = Post.objects.exclude(image='').only('image').order_by('pk')
+        done = 0
+        for post in posts.iterator(chunk_size=options['chunk_size']):
+            pregenerate(post.image)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры построены для {done} постов.'))
+
+    def handle_queue(self, chunk_size, watch):
+        while True:
+            done = process_queue(chunk_size)
+            if done or not watch:
+                self.stdout.write(self.style.SUCCESS(
+                    f'Миниатюры построены для {done} картинок из очереди.'))
+            if not watch:
+                return
+            time.sleep(watch)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Строит полнотекстовый индекс постов заново.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс построен.'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Заново собирает ленты подписок пользователей.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            timeline.rebuild()
+        self.stdout.write(self.style.SUCCESS('Ленты подписок собраны.'))
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seed import seed
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, группами, '
+            'постами, подписками и комментариями для нагрузочных тестов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20,
+                            help='Подписок на пользователя в среднем.')
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--exponent', type=float, default=1.2,
+                            help='Показатель степенного закона для авторов.')
+        parser.add_argument('--days', type=int, default=365,
+                            help='За сколько дней распределить посты.')
+        parser.add_argument('--password', default='password',
+                            help='Пароль всех созданных пользователей.')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        start = time.monotonic()
+        seed(
+            users=options['users'], groups=options['groups'],
+            posts=options['posts'], follows=options['follows'],
+            comments=options['comments'], seed=options['seed'],
+            exponent=options['exponent'], days=options['days'],
+            password=options['password'],
+            batch_size=options['batch_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Создано постов: {options['posts']} "
+            f'за {time.monotonic() - start:.0f} с.'))
@@ -0,0 +1,113 @@
+"""Ссылки постов на файлы картинок и сборка осиротевших файлов.
+
+Файл картинки общий у всех постов с одинаковым содержимым
+(core.storage.HashedFileSystemStorage), поэтому вместе с постом его
+удалять нельзя. Сигналы ведут в StoredImage число ссылок на каждый
+файл, а collect() удаляет файлы и их миниатюры, на которые никто
+не ссылается дольше IMAGE_GC_GRACE секунд.
+"""
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from sorl.thumbnail import delete
+from sorl.thumbnail.images import ImageFile
+
+from .counters import BATCH_SIZE, change_counter
+from .models import Post, StoredImage
+
+
+def image_storage():
+    return Post._meta.get_field('image').storage
+
+
+def acquire(name):
+    if not name:
+        return
+    StoredImage.objects.get_or_create(name=name)
+    StoredImage.objects.filter(name=name).update(
+        refs=F('refs') + 1, released=None)
+
+
+def release(name):
+    if not name:
+        return
+    change_counter(StoredImage.objects.filter(name=name), 'refs', -1)
+    StoredImage.objects.filter(
+        name=name, refs=0, released__isnull=True,
+    ).update(released=timezone.now())
+
+
+def touch(name):
+    """Файл загружают снова: отпущенный файл сборщик не тронет ещё
+    IMAGE_GC_GRACE секунд. Если collect() уже удаляет его, UPDATE
+    дождётся конца транзакции сборщика, и файл запишется заново."""
+    StoredImage.objects.filter(name=name, refs=0).update(
+        released=timezone.now())
+
+
+def scan(prefix='posts'):
+    """Заводит записи для файлов, о которых база не знает.
+
+    Такие файлы остаются от загрузок, не дошедших до сохранения поста,
+    или от постов, записанных мимо сигналов (bulk_create, сырой SQL):
+    ссылки считаются по Post.image, как в rebuild_counters(). Время
+    отпускания файла без ссылок берётся из времени его изменения.
+    """
+    storage = image_storage()
+    known = set(StoredImage.objects.values_list('name', flat=True))
+    image_refs = dict(
+        Post.objects.exclude(image='').order_by().values('image')
+        .annotate(refs=Count('pk')).values_list('image', 'refs')
+    )
+    found = []
+
+    def walk(path):
+        directories, files = storage.listdir(path)
+        for name in files:
+            name = os.path.join(path, name)
+            if name in known:
+                continue
+            refs = image_refs.get(name, 0)
+            found.append(StoredImage(
+                name=name, refs=refs, released=None if refs
+                else storage.get_modified_time(name)))
+        for directory in directories:
+            walk(os.path.join(path, directory))
+
+    if storage.exists(prefix):
+        walk(prefix)
+    StoredImage.objects.bulk_create(found, batch_size=BATCH_SIZE)
+    return len(found)
+
+
+def collect(grace=None):
+    """Удаляет файлы без ссылок, отпущенные больше grace секунд назад.
+
+    Запись сначала забирается условным UPDATE: он проверяет, что
+    ссылок всё ещё нет и файл не загружали снова (touch()), и держит
+    блокировку строки до конца транзакции, в которой удаляется файл.
+    Загрузка того же файла в это время ждёт и потом пишет его заново.
+    """
+    if grace is None:
+        grace = settings.IMAGE_GC_GRACE
+    deadline = timezone.now() - timedelta(seconds=grace)
+    storage = image_storage()
+    names = StoredImage.objects.filter(
+        refs=0, released__lte=deadline,
+    ).values_list('name', flat=True)
+    removed = 0
+    for name in names.iterator():
+        with transaction.atomic():
+            claimed = StoredImage.objects.filter(
+                name=name, refs=0, released__lte=deadline,
+            ).update(released=None)
+            if not claimed:
+                continue
+            delete(ImageFile(name, storage))
+            StoredImage.objects.filter(name=name).delete()
+        removed += 1
+    return removed
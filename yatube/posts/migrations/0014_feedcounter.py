@@ -0,0 +1,29 @@
+# Generated by Django 2.2.16 on 2026-10-17 01:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_remove_post_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Лента')),
+                ('value', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+            ],
+            options={
+                'verbose_name': 'Счётчик ленты',
+                'verbose_name_plural': 'Счётчики лент',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follower'),
+        ),
+    ]
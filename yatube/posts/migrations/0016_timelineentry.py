@@ -0,0 +1,53 @@
+# Generated by Django 2.2.16 on 2026-10-17 01:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    """Последние FOLLOW_FEED_BACKFILL постов автора для каждой подписки
+    одним INSERT … SELECT, а не запросом на подписку."""
+    tables = {
+        name: apps.get_model('posts', name)._meta.db_table
+        for name in ('Follow', 'Post', 'TimelineEntry')
+    }
+    schema_editor.execute(
+        f'INSERT INTO {tables["TimelineEntry"]} '
+        '(user_id, post_id, pub_date) '
+        'SELECT follow.user_id, post.id, post.pub_date '
+        f'FROM {tables["Follow"]} follow '
+        'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+        'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+        f') AS position FROM {tables["Post"]}) post '
+        'ON post.author_id = follow.author_id AND post.position <= %s',
+        [settings.FOLLOW_FEED_BACKFILL])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0015_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', '-pub_date'], name='timeline_user_pub_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_entry'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
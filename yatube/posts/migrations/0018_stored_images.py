@@ -0,0 +1,49 @@
+# Generated by Django 2.2.16 on 2026-10-17 01:21
+
+import core.storage
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stored_images(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    StoredImage = apps.get_model('posts', 'StoredImage')
+    StoredImage.objects.bulk_create(
+        [StoredImage(name=row['image'], refs=row['refs'])
+         for row in Post.objects.exclude(image='').order_by()
+         .values('image').annotate(refs=Count('pk'))],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Файл')),
+                ('refs', models.PositiveIntegerField(default=0, verbose_name='Число ссылок')),
+                ('released', models.DateTimeField(blank=True, null=True, verbose_name='Последняя ссылка снята')),
+            ],
+            options={
+                'verbose_name': 'Файл картинки',
+                'verbose_name_plural': 'Файлы картинок',
+            },
+        ),
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.storage.HashedFileSystemStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddIndex(
+            model_name='storedimage',
+            index=models.Index(fields=['refs', 'released'], name='stored_image_refs_released'),
+        ),
+        migrations.RunPython(fill_stored_images, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+import re
+from functools import lru_cache
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.search
+import snowballstemmer
+
+
+def fill_search_index(connection):
+    """Индексирует существующие посты тем же способом, что
+    posts.search на момент этой миграции."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'INSERT INTO posts_post_search (rowid, document) '
+                "SELECT id, to_tsvector('russian', text) FROM posts_post")
+            return
+        stem = lru_cache(maxsize=None)(
+            snowballstemmer.stemmer('russian').stemWord)
+        word_re = re.compile(r'\w+')
+        cursor.execute('SELECT id, text FROM posts_post')
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            with connection.cursor() as writer:
+                writer.executemany(
+                    'INSERT INTO posts_post_search (rowid, document) '
+                    'VALUES (%s, %s)',
+                    [(pk, ' '.join(map(stem, word_re.findall(
+                        text.lower().replace('ё', 'е')))))
+                     for pk, text in rows])
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE posts_post_search ('
+            'rowid integer PRIMARY KEY '
+            'REFERENCES posts_post (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)')
+        schema_editor.execute(
+            'CREATE INDEX posts_post_search_document '
+            'ON posts_post_search USING GIN (document)')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_search USING fts5(document)')
+    else:
+        # Без полнотекстового поиска: основы слов ищутся через LIKE.
+        schema_editor.execute(
+            'CREATE TABLE posts_post_search ('
+            'rowid integer PRIMARY KEY '
+            'REFERENCES posts_post (id) ON DELETE CASCADE, '
+            'document text NOT NULL)')
+    fill_search_index(connection)
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute('DROP TABLE posts_post_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_stored_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search', serialize=False, to='posts.Post')),
+                ('document', posts.search.SearchDocumentField()),
+            ],
+            options={
+                'db_table': 'posts_post_search',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.db import migrations
+from django.db.models import Count
+
+
+def backfill_user_stats(apps, schema_editor):
+    """Заводит счётчики пользователям, созданным мимо сигнала
+    (loaddata, bulk_create, сырой SQL)."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+
+    def counts(model, field, pks):
+        return dict(
+            model.objects.filter(**{f'{field}__in': pks}).order_by()
+            .values(field).annotate(total=Count('pk'))
+            .values_list(field, 'total')
+        )
+
+    pks = list(User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True))
+    for start in range(0, len(pks), 500):
+        chunk = pks[start:start + 500]
+        posts = counts(Post, 'author', chunk)
+        followers = counts(Follow, 'author', chunk)
+        following = counts(Follow, 'user', chunk)
+        UserStats.objects.bulk_create([
+            UserStats(
+                user_id=pk,
+                posts_count=posts.get(pk, 0),
+                followers_count=followers.get(pk, 0),
+                following_count=following.get(pk, 0),
+            )
+            for pk in chunk
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_user_stats, migrations.RunPython.noop),
+    ]
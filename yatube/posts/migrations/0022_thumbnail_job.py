@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-17 03:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_timeline_feed_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Файл')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлена в очередь')),
+            ],
+            options={
+                'verbose_name': 'Нарезка миниатюр',
+                'verbose_name_plural': 'Очередь нарезки миниатюр',
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-17 03:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_thumbnail_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportProgress',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True, verbose_name='Загрузка')),
+                ('done', models.PositiveIntegerField(default=0, verbose_name='Загружено записей')),
+            ],
+            options={
+                'verbose_name': 'Ход загрузки',
+                'verbose_name_plural': 'Ход загрузок',
+            },
+        ),
+    ]
@@ -1,7 +1,14 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import F, Subquery
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 
+from core.models import AtomicSaveModel
+from core.storage import HashedFileSystemStorage
+
+from .search import SearchDocumentField, SearchRank, terms
 from .validators import validate_not_empty
 
 
@@ -12,6 +19,8 @@ class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        'Число постов', default=0, editable=False)
 
     def __str__(self) -> str:
         return self.title
@@ -20,7 +29,35 @@ class Group(models.Model):
         return reverse('all_posts:group_list', kwargs={'slug': self.slug})
 
 
-class Post(models.Model):
+FEED_FIELDS = (
+    'text', 'pub_date', 'image', 'author', 'group',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title', 'group__slug',
+)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для лент: автор и группа одним JOIN, без лишних колонок."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def search(self, query):
+        """Посты, найденные по запросу, с релевантностью в rank.
+
+        Релевантность считается только для SEARCH_RANK_LIMIT самых
+        новых совпадений: у частого слова их сотни тысяч, и ранжировать
+        все — секунды на каждую страницу.
+        """
+        if terms(query):
+            found = self.filter(
+                search__document__match=query,
+                search__pk__gte=PostSearch.objects.newest_limit(query))
+        else:
+            found = self.none()
+        return found.annotate(rank=SearchRank(query))
+
+
+class Post(AtomicSaveModel):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста',
@@ -48,19 +85,82 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=HashedFileSystemStorage(),
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев', default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_pub_date_id'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_pub_date_id'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_pub_date_id'),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_group_id = instance.__dict__.get('group_id')
+        instance._loaded_author_id = instance.__dict__.get('author_id')
+        instance._loaded_image = instance.__dict__.get('image')
+        instance._loaded_text = instance.__dict__.get('text')
+        return instance
+
 
-class Comment(models.Model):
+class PostSearchQuerySet(models.QuerySet):
+    def matching(self, query):
+        """Строки индекса по запросу: число найденных постов без JOIN."""
+        if not terms(query):
+            return self.none()
+        return self.filter(document__match=query)
+
+    def candidates(self, query):
+        """Не больше SEARCH_RANK_LIMIT самых новых строк по запросу."""
+        return self.matching(query).order_by(
+            F('post_id').desc())[:settings.SEARCH_RANK_LIMIT]
+
+    def newest_limit(self, query):
+        """Наименьший id поста среди candidates(): условие rowid >= id
+        индекс читает с конца и не перебирает остальные совпадения."""
+        limit = settings.SEARCH_RANK_LIMIT
+        return Coalesce(Subquery(self.matching(query).order_by(
+            F('post_id').desc()).values('post_id')[limit - 1:limit]), 0)
+
+
+class PostSearch(models.Model):
+    """Строка полнотекстового индекса поста (см. posts.search).
+
+    Таблица создаётся миграцией отдельно для SQLite и PostgreSQL.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search',
+    )
+    document = SearchDocumentField()
+
+    objects = PostSearchQuerySet.as_manager()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_search'
+
+
+class Comment(AtomicSaveModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -81,12 +181,16 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comment_post_created_id'),
+        ]
 
     def __str__(self):
         return f"Запись: '{self.post}', автор: '{self.author}'"
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -104,3 +208,125 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique_follower')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user'),
+        ]
+
+
+class TimelineQuerySet(models.QuerySet):
+    def feed(self):
+        """Записи ленты подписок с постами, как в PostQuerySet.feed()."""
+        return self.select_related('post__author', 'post__group').only(
+            'user', 'pub_date', 'post',
+            *(f'post__{field}' for field in FEED_FIELDS))
+
+
+class TimelineEntry(models.Model):
+    """Пост в заранее собранной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    objects = TimelineQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='timeline_user_pub_date_post'),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, поддерживаемые при записи."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class FeedCounter(models.Model):
+    """Число постов в ленте, поддерживаемое при сохранении и удалении."""
+    key = models.CharField('Лента', max_length=64, unique=True)
+    value = models.PositiveIntegerField('Число постов', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик ленты'
+        verbose_name_plural = 'Счётчики лент'
+
+    def __str__(self):
+        return f'{self.key}: {self.value}'
+
+
+class ImportProgress(models.Model):
+    """Сколько записей файла уже загрузил import_posts.
+
+    Пишется в транзакции пачки: после сбоя --resume продолжает ровно
+    с первой незакоммиченной записи.
+    """
+    key = models.CharField('Загрузка', max_length=255, unique=True)
+    done = models.PositiveIntegerField('Загружено записей', default=0)
+
+    class Meta:
+        verbose_name = 'Ход загрузки'
+        verbose_name_plural = 'Ход загрузок'
+
+    def __str__(self):
+        return f'{self.key}: {self.done}'
+
+
+class ThumbnailJob(models.Model):
+    """Картинка, для которой ещё не построены миниатюры."""
+    name = models.CharField('Файл', max_length=100, unique=True)
+    created = models.DateTimeField('Поставлена в очередь', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Нарезка миниатюр'
+        verbose_name_plural = 'Очередь нарезки миниатюр'
+
+    def __str__(self):
+        return self.name
+
+
+class StoredImage(models.Model):
+    """Файл картинки и число постов, которые на него ссылаются."""
+    name = models.CharField('Файл', max_length=100, unique=True)
+    refs = models.PositiveIntegerField('Число ссылок', default=0)
+    released = models.DateTimeField(
+        'Последняя ссылка снята', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
+        indexes = [
+            models.Index(fields=['refs', 'released'],
+                         name='stored_image_refs_released'),
+        ]
+
+    def __str__(self):
+        return f'{self.name}: {self.refs}'
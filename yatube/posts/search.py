@@ -0,0 +1,162 @@
+"""Полнотекстовый поиск по постам.
+
+Индекс — отдельная таблица posts_post_search, по строке на пост
+(rowid = id поста). В SQLite это виртуальная таблица FTS5, в которую
+пишутся основы слов после русского стеммера Snowball; в PostgreSQL —
+колонка tsvector с GIN-индексом, которую строит to_tsvector('russian').
+В остальных базах это обычная таблица с теми же основами слов, поиск
+по ней идёт через LIKE, как icontains, и без релевантности.
+Индекс обновляется сигналами при сохранении и удалении поста.
+"""
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, FloatField, Func, Lookup, TextField
+
+
+WORD_RE = re.compile(r'\w+')
+BATCH_SIZE = 1000
+STEM_CACHE_SIZE = 100000
+
+_stemmer = snowballstemmer.stemmer('russian')
+
+
+@lru_cache(maxsize=STEM_CACHE_SIZE)
+def stem(word):
+    # Стеммер на чистом Python тратит на слово десятки микросекунд,
+    # а словарь текстов мал по сравнению с их объёмом.
+    return _stemmer.stemWord(word)
+
+
+def terms(text):
+    """Основы слов текста в нижнем регистре, ё заменена на е."""
+    return [stem(word)
+            for word in WORD_RE.findall(text.lower().replace('ё', 'е'))]
+
+
+def match_query(text):
+    """Запрос FTS5: все основы слов из text, каждая в кавычках."""
+    return ' '.join(f'"{term}"' for term in terms(text))
+
+
+class SearchDocumentField(TextField):
+    """Документ индекса: текст FTS5 в SQLite, tsvector в PostgreSQL."""
+
+    def db_type(self, connection):
+        if connection.vendor == 'postgresql':
+            return 'tsvector'
+        return super().db_type(connection)
+
+
+@SearchDocumentField.register_lookup
+class Match(Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        # Без полнотекстового поиска в базе: документ — строка основ
+        # слов, в ней ищется каждая основа запроса, как в icontains.
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        lhs = connection.ops.lookup_cast('icontains') % lhs
+        pattern = connection.operators['icontains']
+        _, rhs_params = self.process_rhs(compiler, connection)
+        sql, params = [], []
+        for term in terms(' '.join(rhs_params)):
+            sql.append(f'{lhs} {pattern}')
+            like = connection.ops.prep_for_like_query(term)
+            params.extend([*lhs_params, f'%{like}%'])
+        return ' AND '.join(sql) or '1 = 0', params
+
+    def as_sqlite(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        rhs_params = [match_query(param) for param in rhs_params]
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+    def as_postgresql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return (f"{lhs} @@ plainto_tsquery('russian', {rhs})",
+                lhs_params + rhs_params)
+
+
+class SearchRank(Func):
+    """Релевантность найденного поста: чем больше, тем выше в выдаче."""
+
+    output_field = FloatField()
+
+    def __init__(self, query):
+        super().__init__(F('search__document'), query=query)
+
+    def as_sql(self, compiler, connection):
+        # Без полнотекстового поиска релевантность не считается,
+        # и найденные посты идут просто от новых к старым.
+        return '0', []
+
+    def as_sqlite(self, compiler, connection):
+        # bm25() принимает имя таблицы FTS5, а не колонку, и возвращает
+        # тем меньшее число, чем документ релевантнее.
+        document = self.source_expressions[0]
+        table = compiler.quote_name_unless_alias(document.alias)
+        return f'-bm25({table})', []
+
+    def as_postgresql(self, compiler, connection):
+        # ts_rank_cd() возвращает real: без приведения к double
+        # precision ранг из курсора не совпадёт с ним при сравнении.
+        document, params = compiler.compile(self.source_expressions[0])
+        return (f"ts_rank_cd({document}, "
+                f"plainto_tsquery('russian', %s))::float8",
+                params + [self.extra['query']])
+
+
+def index_posts(rows, using=DEFAULT_DB_ALIAS):
+    """Записывает в индекс пары (id, текст), заменяя старые строки."""
+    rows = list(rows)
+    if not rows:
+        return
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.executemany(
+                'INSERT INTO posts_post_search (rowid, document) '
+                "VALUES (%s, to_tsvector('russian', %s)) "
+                'ON CONFLICT (rowid) DO UPDATE '
+                'SET document = EXCLUDED.document',
+                rows)
+        else:
+            cursor.executemany(
+                'DELETE FROM posts_post_search WHERE rowid = %s',
+                [(pk,) for pk, text in rows])
+            cursor.executemany(
+                'INSERT INTO posts_post_search (rowid, document) '
+                'VALUES (%s, %s)',
+                [(pk, ' '.join(terms(text))) for pk, text in rows])
+
+
+def index_post(post, using=DEFAULT_DB_ALIAS):
+    index_posts([(post.pk, post.text)], using)
+
+
+def remove_post(post_id, using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM posts_post_search WHERE rowid = %s', [post_id])
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS):
+    """Строит индекс заново по всем постам."""
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM posts_post_search')
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'INSERT INTO posts_post_search (rowid, document) '
+                "SELECT id, to_tsvector('russian', text) FROM posts_post")
+            return
+        cursor.execute('SELECT id, text FROM posts_post')
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            index_posts(rows, using)
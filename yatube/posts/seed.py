@@ -0,0 +1,160 @@
+"""Синтетические данные для нагрузочных тестов и замеров.
+
+Пользователи, группы, посты, подписки и комментарии вставляются
+пачками через bulk_create с заранее известными id, поэтому связи
+не приходится перечитывать из базы, а память не зависит от объёма.
+Авторы постов и популярность авторов у подписчиков распределены
+по степенному закону (вес автора ~ 1 / rank**exponent): немногие
+пишут почти всё и собирают почти всех подписчиков, как в живой ленте.
+При одинаковом seed набор данных получается тем же самым.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from . import search
+from .bulk import finish_import, keep_dates
+from .caching import bump_feed_versions
+from .counters import INDEX_FEED
+from .models import Comment, Follow, Group, Post, User
+
+
+SENTENCE_POOL = 5000
+
+
+class Seeder:
+    def __init__(self, seed=0, batch_size=5000, exponent=1.2, days=365,
+                 password='password'):
+        self.rng = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.batch_size = batch_size
+        self.exponent = exponent
+        self.days = days
+        self.password = make_password(password)
+        # Faker медленный; тексты собираются из готовых предложений.
+        self.sentences = [self.fake.sentence(nb_words=10)
+                          for _ in range(SENTENCE_POOL)]
+
+    def text(self, low, high):
+        return ' '.join(self.rng.choices(
+            self.sentences, k=self.rng.randint(low, high)))
+
+    def power_law(self, count):
+        """Накопленные веса для rng.choices по степенному закону."""
+        return list(accumulate(
+            1 / rank ** self.exponent for rank in range(1, count + 1)))
+
+    def insert(self, model, objects, after=None):
+        """Вставляет объекты пачками, каждую в своей транзакции."""
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) == self.batch_size:
+                self.flush(model, batch, after)
+                batch = []
+        if batch:
+            self.flush(model, batch, after)
+
+    def flush(self, model, batch, after):
+        with transaction.atomic(), keep_dates(model):
+            model.objects.bulk_create(batch)
+            if after is not None:
+                after(batch)
+
+    def next_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def users(self, count):
+        first = self.next_id(User)
+        joined = timezone.now() - timedelta(days=self.days)
+        self.insert(User, (
+            User(pk=pk, username=f'{self.fake.user_name()}{pk}',
+                 first_name=self.fake.first_name(),
+                 last_name=self.fake.last_name(),
+                 password=self.password, date_joined=joined)
+            for pk in range(first, first + count)
+        ))
+        return list(range(first, first + count))
+
+    def groups(self, count):
+        first = self.next_id(Group)
+        self.insert(Group, (
+            Group(pk=pk, title=f'{self.fake.word().capitalize()} {pk}',
+                  slug=f'group-{pk}', description=self.text(1, 3))
+            for pk in range(first, first + count)
+        ))
+        return list(range(first, first + count))
+
+    def posts(self, count, user_ids, group_ids):
+        """Посты по возрастанию даты за последние days дней."""
+        first = self.next_id(Post)
+        weights = self.power_law(len(user_ids))
+        start = timezone.now() - timedelta(days=self.days)
+        step = timedelta(days=self.days) / max(count, 1)
+        self.pub_date = lambda pk: start + step * (pk - first)
+
+        def generate():
+            for number in range(count):
+                group_id = None
+                if group_ids and self.rng.random() < 0.5:
+                    group_id = self.rng.choice(group_ids)
+                pk = first + number
+                author_id, = self.rng.choices(user_ids, cum_weights=weights)
+                yield Post(pk=pk, author_id=author_id, group_id=group_id,
+                           text=self.text(1, 6), pub_date=self.pub_date(pk))
+
+        self.insert(Post, generate(), after=lambda batch: search.index_posts(
+            (post.pk, post.text) for post in batch))
+        return range(first, first + count)
+
+    def follows(self, per_user, user_ids):
+        """Каждый подписывается в среднем на per_user авторов,
+        популярных — чаще."""
+        weights = self.power_law(len(user_ids))
+
+        def generate():
+            for user_id in user_ids:
+                authors = set(self.rng.choices(
+                    user_ids, cum_weights=weights,
+                    k=self.rng.randint(0, 2 * per_user)))
+                authors.discard(user_id)
+                for author_id in sorted(authors):
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        self.insert(Follow, generate())
+
+    def comments(self, count, user_ids, post_ids):
+        """Комментарии к случайным постам в течение суток после них."""
+        weights = self.power_law(len(user_ids))
+
+        def generate():
+            for _ in range(count):
+                post_id = self.rng.choice(post_ids)
+                author_id, = self.rng.choices(user_ids, cum_weights=weights)
+                created = self.pub_date(post_id) + timedelta(
+                    seconds=self.rng.uniform(0, 86400))
+                yield Comment(post_id=post_id, author_id=author_id,
+                              text=self.text(1, 2), created=created)
+
+        self.insert(Comment, generate())
+
+
+def seed(users=1000, groups=20, posts=100000, follows=20, comments=100000,
+         **options):
+    """Создаёт набор данных и пересчитывает счётчики и ленты."""
+    seeder = Seeder(**options)
+    user_ids = seeder.users(users)
+    group_ids = seeder.groups(groups)
+    post_ids = seeder.posts(posts, user_ids, group_ids)
+    seeder.follows(follows, user_ids)
+    if post_ids:
+        seeder.comments(comments, user_ids, post_ids)
+    finish_import()
+    bump_feed_versions([INDEX_FEED])
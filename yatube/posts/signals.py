@@ -0,0 +1,127 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.storage import before_save
+
+from . import media, search, thumbnails, timeline
+from .caching import bump_feed_versions, post_page, post_tags
+from .counters import (INDEX_FEED, author_feed, change_author_counter,
+                       change_counter, change_group_counter,
+                       change_post_counters, follow_feed, forget_feed_count,
+                       group_feed)
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+def loaded_value(instance, attname, deferred):
+    """Значение поля при загрузке из базы (Post.from_db)."""
+    if attname in deferred:
+        return getattr(instance, attname)
+    return getattr(instance, f'_loaded_{attname}', getattr(instance, attname))
+
+
+@receiver(post_save, sender=Post)
+def handle_saved_post(sender, instance, created, raw, using, **kwargs):
+    if raw:
+        return
+    deferred = instance.get_deferred_fields()
+    loaded_group_id = loaded_value(instance, 'group_id', deferred)
+    tags = post_tags(instance, loaded_group_id)
+    if created:
+        change_post_counters(instance, 1)
+        timeline.fan_out(instance)
+    else:
+        if loaded_group_id != instance.group_id:
+            change_group_counter(loaded_group_id, -1)
+            change_group_counter(instance.group_id, 1)
+        loaded_author_id = loaded_value(instance, 'author_id', deferred)
+        if loaded_author_id != instance.author_id:
+            change_author_counter(loaded_author_id, -1)
+            change_author_counter(instance.author_id, 1)
+            timeline.reassign(instance)
+            tags.add(author_feed(loaded_author_id))
+    bump_feed_versions(tags, using)
+    if 'image' not in deferred:
+        loaded_image = getattr(instance, '_loaded_image', None)
+        if instance.image.name != loaded_image:
+            media.acquire(instance.image.name)
+            media.release(loaded_image)
+            if instance.image:
+                thumbnails.schedule(instance.image)
+        instance._loaded_image = instance.image.name
+    if 'text' not in deferred:
+        if instance.text != getattr(instance, '_loaded_text', None):
+            search.index_post(instance, using)
+        instance._loaded_text = instance.text
+    instance._loaded_group_id = instance.group_id
+    instance._loaded_author_id = instance.author_id
+
+
+@receiver(before_save)
+def handle_image_saving(sender, name, **kwargs):
+    media.touch(name)
+
+
+@receiver(post_delete, sender=Post)
+def handle_deleted_post(sender, instance, using, **kwargs):
+    change_post_counters(instance, -1)
+    search.remove_post(instance.pk, using)
+    if 'image' not in instance.get_deferred_fields():
+        media.release(instance.image.name)
+    bump_feed_versions(post_tags(instance), using)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    if created:
+        change_counter(Post.objects.filter(pk=instance.post_id),
+                       'comments_count', 1)
+    bump_feed_versions([post_page(instance.post_id)])
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    change_counter(Post.objects.filter(pk=instance.post_id),
+                   'comments_count', -1)
+    bump_feed_versions([post_page(instance.post_id)])
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def handle_changed_group(sender, instance, raw=False, **kwargs):
+    """Название и адрес группы видны в её ленте, в общей ленте
+    и на страницах постов группы."""
+    if not raw:
+        bump_feed_versions([group_feed(instance.pk), INDEX_FEED])
+
+
+def change_follow_counters(follow, delta):
+    change_counter(UserStats.objects.filter(pk=follow.author_id),
+                   'followers_count', delta)
+    change_counter(UserStats.objects.filter(pk=follow.user_id),
+                   'following_count', delta)
+    forget_feed_count(follow_feed(follow.user_id))
+    bump_feed_versions([follow_feed(follow.user_id),
+                        author_feed(follow.author_id),
+                        author_feed(follow.user_id)])
+
+
+@receiver(post_save, sender=Follow)
+def handle_saved_follow(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_follow_counters(instance, 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def handle_deleted_follow(sender, instance, **kwargs):
+    change_follow_counters(instance, -1)
+    timeline.prune(instance.user_id, instance.author_id)
+    timeline.catch_up(instance.author_id)
@@ -0,0 +1,14 @@
+from django import template
+
+from posts.models import Follow
+
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context, author_id):
+    """Подписан ли пользователь запроса на автора author_id."""
+    user = context['request'].user
+    return user.is_authenticated and Follow.objects.filter(
+        user=user, author_id=author_id).exists()
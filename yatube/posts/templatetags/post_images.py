@@ -0,0 +1,87 @@
+from django import template
+from django.conf import settings
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
+from sorl.thumbnail import get_thumbnail
+
+from posts.thumbnails import (FALLBACK_FORMAT, MIME_TYPES,
+                              fallback_variant, image_variants, prefetch,
+                              schedule)
+
+
+register = template.Library()
+
+
+def picture(image, lazy=True, thumbnails=None):
+    """Разметка <picture> с srcset по ширинам и форматам.
+
+    thumbnails — результат posts.thumbnails.prefetch(): найденные там
+    миниатюры берутся без запроса к хранилищу ключей. Если вариантов
+    картинки там нет, выводится одна миниатюра для src, как раньше,
+    а остальные ставятся в очередь на нарезку.
+    """
+    if not image:
+        return ''
+    if thumbnails is None:
+        thumbnails = prefetch([image])
+    fallback = thumbnails.get((image.name, *fallback_key()))
+    variants = ready_variants(image, thumbnails)
+    if fallback is None or variants is None:
+        schedule(image)
+        geometry_string, options = fallback_variant()
+        fallback = get_thumbnail(image, geometry_string, **options)
+        variants = []
+    srcsets = {}
+    for options, image_file in variants:
+        srcsets.setdefault(options['format'], []).append(
+            f'{image_file.url} {image_file.width}w')
+    sizes = settings.POST_IMAGE_SIZES
+    attributes = []
+    srcset = srcsets.pop(FALLBACK_FORMAT, None)
+    if srcset:
+        attributes.append(format_html(
+            'srcset="{}" sizes="{}"', ', '.join(srcset), sizes))
+    if fallback.size:
+        attributes.append(format_html(
+            'width="{}" height="{}"', fallback.width, fallback.height))
+    if lazy:
+        attributes.append(mark_safe('loading="lazy"'))
+    attributes.append(mark_safe('decoding="async"'))
+    return format_html(
+        '<picture>{}<img class="card-img my-2" src="{}" {} alt=""></picture>',
+        format_html_join(
+            '', '<source type="{}" srcset="{}" sizes="{}">',
+            ((MIME_TYPES[format_], ', '.join(srcset), sizes)
+             for format_, srcset in srcsets.items()),
+        ),
+        fallback.url,
+        mark_safe(' '.join(attributes)),
+    )
+
+
+def fallback_key():
+    geometry_string, options = fallback_variant()
+    return geometry_string, options['format']
+
+
+def ready_variants(image, thumbnails):
+    """[(опции, ImageFile)] вариантов не шире оригинала или None,
+    если размер оригинала или какой-то из вариантов неизвестен."""
+    source = thumbnails.get(image.name)
+    if source is None or not source.size:
+        return None
+    variants = []
+    for geometry_string, options in image_variants(source.width):
+        image_file = thumbnails.get(
+            (image.name, geometry_string, options['format']))
+        if image_file is None:
+            return None
+        if image_file.size:
+            variants.append((options, image_file))
+    return variants
+
+
+@register.simple_tag
+def post_image(image, lazy=True):
+    """Картинка поста: <picture> с srcset по ширинам и форматам."""
+    return picture(image, lazy)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+
+User = get_user_model()
+
+
+class AdminChangelistTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='')
+        Follow.objects.create(user=cls.reader, author=cls.admin)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def add_posts(self, count):
+        for number in range(count):
+            post = Post.objects.create(
+                author=self.admin, group=self.group,
+                text=f'Кошки и собаки {number}')
+            Comment.objects.create(
+                post=post, author=self.reader, text='Комментарий')
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Связанные объекты и группы не запрашиваются построчно."""
+        for model in ('post', 'comment', 'follow'):
+            with self.subTest(model=model):
+                Post.objects.all().delete()
+                self.add_posts(1)
+                few = self.changelist_queries(model)
+                self.add_posts(5)
+                self.assertEqual(self.changelist_queries(model), few)
+
+    def test_no_full_result_count(self):
+        self.add_posts(2)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошка'})
+        self.assertIsNone(response.context['cl'].full_result_count)
+
+    def test_group_is_editable_without_listing_all_groups(self):
+        """Группа правится прямо в списке через автокомплит: в <select>
+        только выбранная группа."""
+        self.add_posts(1)
+        other = Group.objects.create(title='Другая группа', slug='other')
+        response = self.client.get(reverse('admin:posts_post_changelist'))
+        self.assertContains(response, 'name="form-0-group"')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, 'Тестовая группа')
+        self.assertNotContains(response, 'Другая группа')
+
+        post = Post.objects.get()
+        self.client.post(reverse('admin:posts_post_changelist'), {
+            'form-TOTAL_FORMS': 1, 'form-INITIAL_FORMS': 1,
+            'form-0-id': post.pk, 'form-0-group': other.pk, '_save': 'Save',
+        })
+        post.refresh_from_db()
+        self.assertEqual(post.group, other)
+
+    def test_search_uses_full_text_index(self):
+        self.add_posts(2)
+        Post.objects.create(author=self.admin, text='Только ежи')
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, {'q': 'кошками'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        sql = ' '.join(query['sql'] for query in context.captured_queries)
+        self.assertIn('posts_post_search', sql)
+        self.assertNotIn('LIKE', sql)
@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, ImportProgress, Post
+
+
+User = get_user_model()
+
+
+class ImportExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='')
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def path(self, name):
+        return os.path.join(self.dir, name)
+
+    def call(self, *args, **options):
+        call_command(*args, stderr=StringIO(), **options)
+
+    def test_round_trip(self):
+        """Выгруженное загружается обратно с теми же датами и связями."""
+        pub_date = timezone.now() - timedelta(days=3)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Кот, «кавычки»\nи,')
+        Post.objects.filter(pk=post.pk).update(pub_date=pub_date)
+        Comment.objects.create(post=post, author=self.reader, text='Ура')
+        Follow.objects.create(user=self.reader, author=self.author)
+        for fmt in ('jsonl', 'csv'):
+            with self.subTest(fmt=fmt):
+                files = {model: self.path(f'{model}.{fmt}')
+                         for model in ('posts', 'comments', 'follows')}
+                for model, path in files.items():
+                    self.call('export_posts', path, model=model,
+                              chunk_size=1)
+                Post.objects.all().delete()
+                Follow.objects.all().delete()
+                for model, path in files.items():
+                    self.call('import_posts', path, model=model)
+                loaded = Post.objects.get()
+                self.assertEqual(
+                    (loaded.pk, loaded.text, loaded.pub_date,
+                     loaded.group, loaded.comments_count),
+                    (post.pk, post.text, pub_date, self.group, 1))
+                self.assertTrue(Post.objects.search('коты').exists())
+                self.assertTrue(Follow.objects.filter(
+                    user=self.reader, author=self.author).exists())
+                self.author.stats.refresh_from_db()
+                self.assertEqual(self.author.stats.posts_count, 1)
+                self.assertEqual(self.author.stats.followers_count, 1)
+                new = Post.objects.create(author=self.author, text='Новый')
+                self.assertGreater(new.pk, post.pk)
+                new.delete()
+
+    def test_resume_after_error(self):
+        path = self.path('posts.jsonl')
+        with open(path, 'w') as file:
+            for pk, author in ((101, 'author'), (102, 'author'),
+                               (103, 'newcomer')):
+                file.write(json.dumps(
+                    {'id': pk, 'author': author, 'text': f'Пост {pk}'}
+                ) + '\n')
+        with self.assertRaises(CommandError):
+            self.call('import_posts', path, batch_size=1)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(ImportProgress.objects.get().done, 2)
+
+        User.objects.create_user(username='newcomer')
+        self.call('import_posts', path, batch_size=1, resume=True)
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('pk', flat=True)),
+            [101, 102, 103])
+        self.assertFalse(ImportProgress.objects.exists())
+
+    def test_export_resume_appends(self):
+        first = Post.objects.create(author=self.author, text='Первый')
+        path = self.path('posts.csv')
+        self.call('export_posts', path)
+        second = Post.objects.create(author=self.author, text='Второй')
+        self.call('export_posts', path, resume=True)
+        with open(path, newline='') as file:
+            lines = file.read().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[1].startswith(f'{first.pk},'))
+        self.assertTrue(lines[2].startswith(f'{second.pk},'))
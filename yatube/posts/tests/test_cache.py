@@ -0,0 +1,194 @@
+import re
+from http import HTTPStatus
+from io import StringIO
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import cache_settings
+from core.pagecache import page_cache_stats
+
+from ..models import Comment, Follow, Group, Post
+from .utils import on_commit_callbacks
+
+try:
+    import django_redis
+    import fakeredis
+except ImportError:
+    django_redis = fakeredis = None
+
+
+User = get_user_model()
+
+
+@skipUnless(fakeredis, 'нужны django-redis и fakeredis')
+@override_settings(CACHES=cache_settings('fakeredis://', key_prefix='test'))
+class SharedCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.author, text='Первый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_index_fragment_is_shared_and_prefixed(self):
+        """Фрагмент главной хранится в общем кеше с префиксом развёртывания."""
+        content = self.client.get(reverse('all_posts:index')).content
+        keys = django_redis.get_redis_connection().keys('test:*')
+        self.assertTrue(
+            any(b'template.cache.index_page' in key for key in keys))
+
+        Post.objects.update(text='Изменено в обход сигналов')
+        self.assertEqual(
+            self.client.get(reverse('all_posts:index')).content, content)
+
+        with on_commit_callbacks():
+            Post.objects.create(author=self.author, text='Второй пост')
+        self.assertContains(
+            self.client.get(reverse('all_posts:index')), 'Второй пост')
+
+
+@skipUnless(django_redis, 'нужен django-redis')
+@override_settings(CACHES=cache_settings('redis://127.0.0.1:1/0'))
+class CacheDownTests(TestCase):
+    def test_pages_work_without_cache_server(self):
+        """Недоступный сервер кеша не ломает ленты и запись."""
+        author = User.objects.create_user(username='HasNoName')
+        client = Client()
+        client.force_login(author)
+        response = client.post(
+            reverse('all_posts:post_create'), {'text': 'Пост без кеша'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        for url in (reverse('all_posts:index'), reverse('all_posts:profile',
+                    kwargs={'username': author.username})):
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'Пост без кеша')
+
+
+@override_settings(PAGE_CACHE=True)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый пост')
+        cls.other = Post.objects.create(author=cls.author, text='Другой')
+
+    def setUp(self):
+        cache.clear()
+        self.urls = {
+            'index': reverse('all_posts:index'),
+            'group': reverse('all_posts:group_list',
+                             kwargs={'slug': self.group.slug}),
+            'profile': reverse('all_posts:profile',
+                               kwargs={'username': self.author.username}),
+            'post': reverse('all_posts:post_detail',
+                            kwargs={'post_id': self.post.pk}),
+            'other': reverse('all_posts:post_detail',
+                             kwargs={'post_id': self.other.pk}),
+        }
+        for url in self.urls.values():
+            self.client.get(url)
+
+    def cached(self):
+        return {name for name, url in self.urls.items()
+                if self.client.get(url)['X-Page-Cache'] == 'hit'}
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.urls['index'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Первый пост')
+        self.assertIn('Cookie', response['Vary'])
+        self.assertIn('public', response['Cache-Control'])
+        self.assertEqual(self.cached(), set(self.urls))
+        self.assertEqual(
+            self.client.get(self.urls['index'], {'page': 1})['X-Page-Cache'],
+            'miss')
+        self.assertEqual(
+            self.client.get(self.urls['index'],
+                            {'utm_source': 'mail'})['X-Page-Cache'],
+            'hit')
+
+    def test_logged_in_users_get_cached_pages_with_own_fragments(self):
+        """Общая часть страницы из кеша, шапка и кнопки — свои."""
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=self.author)
+        for name in ('post', 'profile'):
+            self.client.get(self.urls[name])
+        checks = (
+            (self.author, 'post', ['Пользователь: HasNoName',
+                                   'редактировать запись', 'csrfmiddleware']),
+            (reader, 'post', ['Пользователь: reader', 'csrfmiddleware']),
+            (reader, 'profile', ['Отписаться']),
+            (None, 'profile', ['Подписаться', 'Войти']),
+        )
+        for user, name, expected in checks:
+            with self.subTest(user=user, page=name):
+                client = Client()
+                if user is not None:
+                    client.force_login(user)
+                response = client.get(self.urls[name])
+                self.assertEqual(response['X-Page-Cache'], 'hit')
+                for text in expected:
+                    self.assertContains(response, text)
+                self.assertNotContains(response, '<!--hole:')
+                self.assertIn('private' if user else 'public',
+                              response['Cache-Control'])
+        response = Client().get(self.urls['post'])
+        self.assertNotContains(response, 'редактировать запись')
+        self.assertNotContains(response, 'csrfmiddleware')
+
+    def test_csrf_token_from_cached_page_is_accepted(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.author)
+        response = client.get(self.urls['post'])
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"',
+                          response.content.decode()).group(1)
+        response = client.post(
+            reverse('all_posts:add_comment',
+                    kwargs={'post_id': self.post.pk}),
+            {'text': 'Из кеша', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_changes_purge_only_tagged_pages(self):
+        """Комментарий, пост и группа сбрасывают только свои страницы."""
+        with on_commit_callbacks():
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text='Комментарий')
+        self.assertEqual(self.cached(),
+                         {'index', 'group', 'profile', 'other'})
+
+        # Число постов автора есть и на страницах других его постов.
+        with on_commit_callbacks():
+            Post.objects.filter(pk=self.other.pk).get().save()
+        self.assertEqual(self.cached(), {'group'})
+
+        with on_commit_callbacks():
+            Group.objects.get(pk=self.group.pk).save()
+        self.assertEqual(self.cached(), {'profile', 'other'})
+
+    def test_pages_signed_with_old_key_are_rendered_again(self):
+        with self.settings(SECRET_KEY='новый ключ'):
+            response = self.client.get(self.urls['post'])
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+            self.assertEqual(response['X-Page-Cache'], 'miss')
+            self.assertContains(response, 'Войти')
+            self.assertEqual(
+                self.client.get(self.urls['post'])['X-Page-Cache'], 'hit')
+
+    def test_hit_ratio(self):
+        self.cached()
+        self.assertEqual(page_cache_stats(), (5, 5))
+        out = StringIO()
+        call_command('page_cache_stats', reset=True, stdout=out)
+        self.assertIn('50.0%', out.getvalue())
+        self.assertEqual(page_cache_stats(), (0, 0))
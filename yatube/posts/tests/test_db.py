@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+
+from core.db import check_connections, database_settings
+
+
+class DatabaseSettingsTests(SimpleTestCase):
+    def test_sqlite_paths(self):
+        cases = (
+            ('sqlite:///db.sqlite3', '/srv/yatube/db.sqlite3'),
+            ('sqlite:////var/lib/yatube.sqlite3', '/var/lib/yatube.sqlite3'),
+        )
+        for url, name in cases:
+            with self.subTest(url=url):
+                config = database_settings(url, '/srv/yatube')['default']
+                self.assertEqual(config['NAME'], name)
+
+    def test_postgres_persistent_connections(self):
+        config = database_settings(
+            'postgres://user:p%40ss@db:6432/yatube?sslmode=require',
+            '/srv/yatube', conn_max_age=600, health_checks=True,
+            pool='pgbouncer',
+        )['default']
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertEqual(
+            (config['USER'], config['PASSWORD'], config['HOST'],
+             config['PORT'], config['NAME']),
+            ('user', 'p@ss', 'db', '6432', 'yatube'))
+        self.assertEqual(config['OPTIONS'], {'sslmode': 'require'})
+        self.assertEqual(config['CONN_MAX_AGE'], 600)
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertTrue(config['DISABLE_SERVER_SIDE_CURSORS'])
+
+    def test_unknown_url_or_pool(self):
+        with self.assertRaises(ImproperlyConfigured):
+            database_settings('mysql://db/yatube', '/srv/yatube')
+        with self.assertRaises(ImproperlyConfigured):
+            database_settings('sqlite:///db.sqlite3', '/srv/yatube',
+                              pool='pgpool')
+
+
+class HealthCheckTests(TestCase):
+    def test_dead_connection_closed_before_request(self):
+        connection.ensure_connection()
+        with mock.patch.dict(connection.settings_dict,
+                             CONN_HEALTH_CHECKS=True), \
+                mock.patch.object(connection, 'is_usable',
+                                  return_value=False), \
+                mock.patch.object(connection, 'close') as close:
+            check_connections()
+        close.assert_called_once_with()
+
+    def test_checks_disabled_by_default(self):
+        connection.ensure_connection()
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+        is_usable.assert_not_called()
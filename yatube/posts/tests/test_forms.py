@@ -1,17 +1,41 @@
+import os
 import shutil
 import tempfile
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.core.management import call_command
+from django.template import Context, Template
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
 
-from ..models import Group, Post, Comment
+from core.kvstore import CacheKVStore
+from ..models import Comment, Group, Post, StoredImage, ThumbnailJob
+from ..thumbnails import image_variants, pregenerate
+from ..uploads import ImageUploadHandler
+from .utils import on_commit_callbacks
 
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -120,3 +144,199 @@ class PostsFormTests(TestCase):
         comment_1 = response.context['comment'][0]
         self.assertEqual(Comment.objects.count(), comment_count + 1)
         self.assertEqual(comment_1.text, form_data['text'])
+
+    def thumbnail_files(self):
+        return [
+            name for _, _, names in os.walk(
+                os.path.join(TEMP_MEDIA_ROOT, 'cache'))
+            for name in names
+        ]
+
+    def remove_thumbnails(self):
+        """Удаляет файлы миниатюр и записи о них в кеше."""
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, 'cache'),
+                      ignore_errors=True)
+        cache.clear()
+
+    def wide_png(self, width=1000, color='blue'):
+        buffer = BytesIO()
+        Image.new('RGB', (width, width // 3), color).save(buffer, 'PNG')
+        return buffer.getvalue()
+
+    def test_image_change_pregenerates_thumbnails(self):
+        """Новая картинка поста сразу нарезается на миниатюры
+        не шире оригинала."""
+        self.remove_thumbnails()
+        uploaded = SimpleUploadedFile(
+            name='edit.png', content=self.wide_png(),
+            content_type='image/png')
+        self.author_client.post(
+            reverse('all_posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': self.post.text, 'image': uploaded},
+        )
+        self.assertEqual(
+            len(self.thumbnail_files()), len(list(image_variants(1000))))
+
+    def test_pregenerate_thumbnails_command(self):
+        self.remove_thumbnails()
+        image = default_storage.save(
+            'posts/command.gif', ContentFile(SMALL_GIF))
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Пост с картинкой', image=image)
+        ])
+        out = StringIO()
+        call_command('pregenerate_thumbnails', stdout=out)
+        self.assertIn('1 постов', out.getvalue())
+        self.assertEqual(
+            len(self.thumbnail_files()), len(list(image_variants(2))) + 1)
+
+    def render_post_image(self, image):
+        return Template(
+            '{% load post_images %}{% post_image image %}'
+        ).render(Context({'image': image}))
+
+    def test_post_image_tag_renders_srcset(self):
+        """Картинка в ленте отдаётся с srcset не шире оригинала
+        и ленивой загрузкой."""
+        image = Post(image=default_storage.save(
+            'posts/tag.png', ContentFile(self.wide_png()))).image
+        pregenerate(image)
+        html = self.render_post_image(image)
+        self.assertIn(' 480w', html)
+        self.assertIn(' 1000w', html)
+        self.assertNotIn(' 1440w', html)
+        self.assertIn(f'sizes="{settings.POST_IMAGE_SIZES}"', html)
+        self.assertIn('loading="lazy"', html)
+
+    @override_settings(THUMBNAIL_PREGENERATE_ASYNC=True)
+    def test_post_image_tag_without_thumbnails_builds_one(self):
+        """Без готовых вариантов шаблон строит одну миниатюру для src,
+        а остальные ставит в очередь для pregenerate_thumbnails."""
+        self.remove_thumbnails()
+        image = Post(image=default_storage.save(
+            'posts/miss.png', ContentFile(self.wide_png()))).image
+        html = self.render_post_image(image)
+        self.assertNotIn('srcset', html)
+        self.assertEqual(len(self.thumbnail_files()), 1)
+        self.assertTrue(ThumbnailJob.objects.filter(name=image.name).exists())
+
+        out = StringIO()
+        call_command('pregenerate_thumbnails', '--queue', stdout=out)
+        self.assertIn('1 картинок', out.getvalue())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.assertIn(' 1000w', self.render_post_image(image))
+
+    def test_feed_thumbnails_are_fetched_in_one_batch(self):
+        """Миниатюры всех постов ленты берутся из кеша одним запросом."""
+        for color in ('red', 'green', 'blue'):
+            with on_commit_callbacks():
+                self.create_post_with(
+                    f'{color}.png', self.wide_png(1440, color))
+        with mock.patch.object(
+                CacheKVStore, 'get_many', autospec=True,
+                side_effect=CacheKVStore.get_many) as get_many, \
+                mock.patch.object(
+                    CacheKVStore, '_get_raw', autospec=True,
+                    side_effect=CacheKVStore._get_raw) as get_raw:
+            response = self.client.get(reverse('all_posts:index'))
+        self.assertEqual(get_many.call_count, 1)
+        self.assertEqual(get_raw.call_count, 0)
+        self.assertContains(response, '<picture>', count=3)
+
+    def create_post_with(self, name, content):
+        return self.authorized_client.post(
+            reverse('all_posts:post_create'),
+            data={'text': 'Пост с картинкой', 'image': SimpleUploadedFile(
+                name=name, content=content, content_type='image/gif')},
+        )
+
+    def test_upload_rejected_early(self):
+        """Слишком тяжёлые, огромные и битые файлы не принимаются."""
+        cases = (
+            ({'POST_IMAGE_MAX_UPLOAD_SIZE': 10}, SMALL_GIF),
+            ({'POST_IMAGE_MAX_PIXELS': 1}, SMALL_GIF),
+            ({}, b'not an image' * 100),
+        )
+        posts_count = Post.objects.count()
+        for overrides, content in cases:
+            with self.subTest(overrides=overrides), \
+                    self.settings(**overrides):
+                response = self.create_post_with('upload.gif', content)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['image'])
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    @override_settings(POST_IMAGE_MAX_UPLOAD_SIZE=10)
+    def test_rejected_upload_stops_reading_request(self):
+        handler = ImageUploadHandler()
+        handler.new_file('image', 'upload.gif', 'image/gif', None)
+        with self.assertRaises(StopUpload) as raised:
+            handler.receive_data_chunk(SMALL_GIF, 0)
+        self.assertTrue(raised.exception.connection_reset)
+        self.assertIn('image', handler.rejected)
+
+    def test_image_views_check_csrf(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        posts_count = Post.objects.count()
+        response = client.post(reverse('all_posts:post_create'),
+                               data={'text': 'Без токена'})
+        self.assertTemplateUsed(response, 'core/403csrf.html')
+        self.assertEqual(Post.objects.count(), posts_count)
+
+    @override_settings(POST_IMAGE_MAX_SIDE=100)
+    def test_large_original_is_downscaled(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 200), 'red').save(buffer, 'JPEG')
+        self.create_post_with('large.jpg', buffer.getvalue())
+        post = Post.objects.latest('pk')
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (100, 50))
+
+    def test_identical_images_share_one_file(self):
+        """Одинаковые картинки хранятся одним файлом с общим счётчиком."""
+        self.create_post_with('first.gif', SMALL_GIF)
+        self.author_client.post(
+            reverse('all_posts:post_create'),
+            data={'text': 'Тот же файл', 'image': SimpleUploadedFile(
+                'second.gif', SMALL_GIF, content_type='image/gif')},
+        )
+        first, second = Post.objects.exclude(image='').order_by('-pk')[:2]
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            StoredImage.objects.get(name=first.image.name).refs, 2)
+
+    def test_collect_images_removes_orphans(self):
+        self.create_post_with('orphan.gif', SMALL_GIF)
+        post = Post.objects.latest('pk')
+        name = post.image.name
+        call_command('collect_images', grace=0, stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+        post.delete()
+        call_command('collect_images', grace=0, stdout=StringIO())
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(StoredImage.objects.filter(name=name).exists())
+
+    def test_upload_of_released_image_stops_its_collection(self):
+        """Файл, который загрузили снова, пока на него нет ссылок,
+        сборщик не удаляет: пост с ним ещё не успел сохраниться."""
+        self.create_post_with('again.gif', SMALL_GIF)
+        post = Post.objects.latest('pk')
+        name = post.image.name
+        post.delete()
+        StoredImage.objects.filter(name=name).update(
+            released=timezone.now() - timedelta(hours=1))
+        self.assertEqual(
+            post.image.storage.save(
+                'posts/again.gif', ContentFile(SMALL_GIF)),
+            name)
+        call_command('collect_images', grace=60, stdout=StringIO())
+        self.assertTrue(post.image.storage.exists(name))
+
+    def test_scan_keeps_images_of_posts_saved_without_signals(self):
+        name = default_storage.save('posts/bulk.gif', ContentFile(SMALL_GIF))
+        Post.objects.bulk_create([
+            Post(text='Без сигналов', author=self.user, image=name)])
+        call_command('collect_images', grace=0, scan=True, stdout=StringIO())
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(StoredImage.objects.get(name=name).refs, 1)
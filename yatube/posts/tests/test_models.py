@@ -1,7 +1,12 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
 
-from ..models import Group, Post
+from ..counters import INDEX_FEED, author_feed, feed_count, group_feed
+from ..models import Comment, Follow, Group, Post, UserStats
 
 
 User = get_user_model()
@@ -55,3 +60,108 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     self.post._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self):
+        stats = UserStats.objects.get(user=self.user)
+        self.assertEqual(stats.posts_count, self.user.posts.count())
+        self.assertEqual(stats.followers_count, self.user.following.count())
+        reader_stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(reader_stats.following_count,
+                         self.reader.follower.count())
+        for group in (self.group, self.other_group):
+            group.refresh_from_db()
+            self.assertEqual(group.posts_count, group.posts.count())
+        for post in Post.objects.all():
+            self.assertEqual(post.comments_count, post.comments.count())
+        self.assertEqual(feed_count(INDEX_FEED, Post.objects.all()),
+                         Post.objects.count())
+
+    def test_counters_follow_writes(self):
+        """Счётчики меняются при создании, правке и удалении записей."""
+        feed_count(INDEX_FEED, Post.objects.all())
+        Post.objects.create(author=self.user, group=self.group, text='1')
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='2')
+        Comment.objects.create(post=post, author=self.reader, text='1')
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        self.assertCounters()
+
+        post = Post.objects.get(pk=post.pk)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters()
+
+        post.comments.all().delete()
+        follow.delete()
+        post.delete()
+        self.assertCounters()
+
+    def test_counters_follow_author_change(self):
+        """Смена автора переносит счётчик постов и записи в лентах."""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=other)
+        post = Post.objects.create(author=self.user, text='1')
+        post = Post.objects.get(pk=post.pk)
+        post.author = other
+        post.save()
+        self.assertCounters()
+        self.assertEqual(UserStats.objects.get(user=other).posts_count, 1)
+        self.assertEqual(
+            list(self.reader.timeline.values_list('post_id', flat=True)),
+            [post.pk])
+
+    def test_feed_count_uses_counters(self):
+        Post.objects.create(author=self.user, group=self.group, text='1')
+        feeds = {
+            author_feed(self.user.pk): self.user.posts.all(),
+            group_feed(self.group.pk): self.group.posts.all(),
+        }
+        for feed, queryset in feeds.items():
+            with self.subTest(feed=feed), self.assertNumQueries(1):
+                self.assertEqual(feed_count(feed, queryset), 1)
+
+    def test_missing_user_stats(self):
+        """Без строки счётчиков пост и лента автора всё равно открываются."""
+        post = Post.objects.create(author=self.user, text='1')
+        UserStats.objects.filter(user=self.user).delete()
+        self.assertEqual(
+            feed_count(author_feed(self.user.pk), self.user.posts.all()), 1)
+        urls = (
+            reverse('all_posts:post_detail', args=(post.pk,)),
+            reverse('all_posts:profile', args=(self.user.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.client.get(urls[0]).context['post_count'], 1)
+
+    def test_rebuild_counters(self):
+        post = Post.objects.create(
+            author=self.user, group=self.group, text='1')
+        Comment.objects.create(post=post, author=self.reader, text='1')
+        Follow.objects.create(user=self.reader, author=self.user)
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7)
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=7)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters()
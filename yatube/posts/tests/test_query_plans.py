@@ -0,0 +1,105 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..seed import seed
+
+
+User = get_user_model()
+INDEX_TABLES = {
+    'post': 'posts_post',
+    'comment': 'posts_comment',
+    'timeline': 'posts_timelineentry',
+}
+# Планы на реальных объёмах: QUERY_PLAN_SEED_POSTS=1000000 добавляет
+# к тестовым данным столько синтетических постов и собирает статистику.
+SEED_POSTS = int(os.getenv('QUERY_PLAN_SEED_POSTS', '0'))
+
+
+class QueryPlanTests(TestCase):
+    """Ленты читаются по составным индексам, а не сортировкой таблицы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(3):
+            cls.post = Post.objects.create(
+                author=cls.author,
+                group=cls.group,
+                text=f'Тестовый пост {i}',
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text='Комментарий')
+        if SEED_POSTS:
+            seed(users=max(SEED_POSTS // 100, 10), posts=SEED_POSTS,
+                 comments=SEED_POSTS // 2)
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            else:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('EXPLAIN ' + sql)
+            return ' '.join(str(row) for row in cursor.fetchall())
+
+    def feed_query(self, url, table):
+        client = Client()
+        client.force_login(self.reader)
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        selects = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{table}"' in query['sql']
+            and 'ORDER BY' in query['sql']
+        ]
+        self.assertTrue(selects, f'{url} не читает {table}')
+        return selects[0]
+
+    def test_feeds_use_composite_indexes(self):
+        group_url = reverse('all_posts:group_list',
+                            kwargs={'slug': self.group.slug})
+        profile_url = reverse('all_posts:profile',
+                              kwargs={'username': self.author.username})
+        detail_url = reverse('all_posts:post_detail',
+                             kwargs={'post_id': self.post.pk})
+        feeds = {
+            reverse('all_posts:index'): 'post_pub_date_id',
+            group_url: 'post_group_pub_date_id',
+            profile_url: 'post_author_pub_date_id',
+            detail_url: 'comment_post_created_id',
+            reverse('all_posts:follow_index'): 'timeline_user_pub_date_post',
+        }
+        for url, index in feeds.items():
+            with self.subTest(url=url):
+                table = INDEX_TABLES[index.split('_')[0]]
+                plan = self.explain(self.feed_query(url, table))
+                self.assertIn(index, plan)
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_use_author_index(self):
+        """Посты знаменитостей в ленте подписок берутся по диапазонам
+        индекса автора."""
+        plan = self.explain(self.feed_query(
+            reverse('all_posts:follow_index'), 'posts_post'))
+        self.assertIn('post_author_pub_date_id', plan)
+
+    def test_fan_out_uses_follow_author_index(self):
+        queryset = Follow.objects.filter(
+            author=self.author).values_list('user_id', flat=True)
+        self.assertIn('follow_author_user', self.explain(str(queryset.query)))
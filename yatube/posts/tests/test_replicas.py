@@ -0,0 +1,93 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.pagecache import bump_tags, lag_key
+from core.replicas import PIN_COOKIE
+
+from ..counters import INDEX_FEED
+from ..models import FeedCounter, Group
+
+
+User = get_user_model()
+REPLICA = 'replica_test'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        # Вторая база SQLite играет роль отстающей реплики: данные
+        # в неё не копируются, поэтому по ответу видно, откуда читала
+        # view. Тестовый раннер о ней не знает, и её тестовая база
+        # заводится и удаляется здесь.
+        connections.databases[REPLICA] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(settings.BASE_DIR, 'replica.sqlite3'),
+        }
+        connections[REPLICA].creation.create_test_db(
+            verbosity=0, serialize=False)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].creation.destroy_test_db(verbosity=0)
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        Group.objects.using(REPLICA).create(
+            title='Только на реплике', slug='replica-only')
+        cls.group_url = reverse(
+            'all_posts:group_list', kwargs={'slug': 'replica-only'})
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_read_only_views_use_replica(self):
+        self.assertEqual(self.client.get(self.group_url).status_code, 200)
+
+    def test_writes_pin_user_to_primary(self):
+        response = self.client.post(
+            reverse('all_posts:post_create'), data={'text': 'Новый пост'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.client.get(self.group_url).status_code, 404)
+
+    def test_writes_while_reading_do_not_pin(self):
+        """Счётчик ленты, заведённый при чтении, не закрепляет
+        пользователя за основной базой."""
+        FeedCounter.objects.all().delete()
+        response = self.client.get(reverse('all_posts:index'))
+        self.assertTrue(FeedCounter.objects.exists())
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_lagging_replica_does_not_fill_caches(self):
+        """Пока реплика может отставать от сдвинутой версии ленты,
+        прочитанное с неё не сохраняется ни фрагментом, ни страницей."""
+        cache.clear()
+        bump_tags([INDEX_FEED])
+        url = reverse('all_posts:index')
+        self.assertEqual(self.client.get(url).context['feed_cache']['ttl'], 0)
+        with self.settings(PAGE_CACHE=True):
+            client = Client()
+            for _ in range(2):
+                self.assertEqual(client.get(url)['X-Page-Cache'], 'miss')
+            cache.delete(lag_key(INDEX_FEED))
+            client.get(url)
+            self.assertEqual(client.get(url)['X-Page-Cache'], 'hit')
+
+    def test_other_views_use_primary(self):
+        response = self.client.get(reverse('all_posts:post_create'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,97 @@
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..search import Match, SearchRank, rebuild_index
+
+
+User = get_user_model()
+SEARCH_URL = reverse('all_posts:search')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.cat = Post.objects.create(
+            author=cls.author, text='Кот сидит на заборе')
+        cls.cats = Post.objects.create(
+            author=cls.author, text='Коты бегают, коты спят, котов много')
+        cls.hedgehog = Post.objects.create(
+            author=cls.author, text='Ёжик в тумане')
+
+    def setUp(self):
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(SEARCH_URL, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_russian_stemming(self):
+        """Находятся другие формы слова, ё не отличается от е."""
+        self.assertCountEqual(self.found('котами'),
+                              [self.cat.pk, self.cats.pk])
+        self.assertEqual(self.found('ежики'), [self.hedgehog.pk])
+        self.assertEqual(self.found('кот забор'), [self.cat.pk])
+
+    def test_ranked_by_relevance(self):
+        self.assertEqual(self.found('коты'), [self.cats.pk, self.cat.pk])
+
+    def test_empty_query_finds_nothing(self):
+        for query in ('', '  ', '!?'):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), [])
+
+    def test_index_follows_edit_and_delete(self):
+        cat = Post.objects.get(pk=self.cat.pk)
+        cat.text = 'Собака сидит на заборе'
+        cat.save()
+        self.assertEqual(self.found('кот'), [self.cats.pk])
+        self.assertEqual(self.found('собаки'), [cat.pk])
+        Post.objects.filter(pk=self.cats.pk).delete()
+        self.assertEqual(self.found('кот'), [])
+
+    def test_keyset_pagination(self):
+        """Курсоры листают выдачу по (rank, id) и сохраняют запрос."""
+        Post.objects.bulk_create([
+            Post(author=self.author, text='Ёжики в лесу')
+            for _ in range(settings.PAGE_COUNT)
+        ])
+        rebuild_index()
+        response = self.client.get(SEARCH_URL, {'q': 'ёжик'})
+        first_page = response.context['page_obj']
+        self.assertEqual(first_page.paginator.count, settings.PAGE_COUNT + 1)
+        self.assertContains(
+            response, f'?q=%D1%91%D0%B6%D0%B8%D0%BA&amp;cursor='
+                      f'{first_page.next_cursor}')
+        second_page = self.client.get(SEARCH_URL, {
+            'q': 'ёжик', 'cursor': first_page.next_cursor,
+        }).context['page_obj']
+        found = [post.pk for post in first_page]
+        found += [post.pk for post in second_page]
+        self.assertEqual(len(set(found)), settings.PAGE_COUNT + 1)
+        self.assertIsNone(second_page.next_cursor)
+
+    @override_settings(SEARCH_RANK_LIMIT=2)
+    def test_only_newest_matches_are_ranked(self):
+        """Ранжируются только SEARCH_RANK_LIMIT самых новых совпадений."""
+        newer = Post.objects.create(author=self.author, text='Кот спит')
+        self.assertCountEqual(self.found('коты'), [self.cats.pk, newer.pk])
+        self.assertEqual(
+            self.client.get(SEARCH_URL, {'q': 'коты'})
+            .context['page_obj'].paginator.count, 2)
+
+    def test_fallback_without_full_text_search(self):
+        """В базах без полнотекстового поиска основы ищутся через LIKE,
+        а найденные посты идут от новых к старым."""
+        with mock.patch.object(Match, 'as_sqlite', Match.as_sql), \
+                mock.patch.object(SearchRank, 'as_sqlite', SearchRank.as_sql):
+            self.assertEqual(self.found('котами'),
+                             [self.cats.pk, self.cat.pk])
+            self.assertEqual(self.found('кот забор'), [self.cat.pk])
+            self.assertEqual(self.found('!?'), [])
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Sum
+from django.test import Client, TestCase, override_settings
+
+from .. import timeline
+from ..models import Comment, Follow, Post, TimelineEntry, UserStats
+from ..seed import seed
+
+
+User = get_user_model()
+SIZES = {'users': 30, 'groups': 3, 'posts': 300, 'follows': 4,
+         'comments': 60}
+
+
+class SeedTests(TestCase):
+    def run_seed(self, **options):
+        seed(**SIZES, batch_size=40, password='secret', **options)
+
+    def test_counts_and_counters(self):
+        self.run_seed()
+        self.assertEqual(
+            (User.objects.count(), Post.objects.count(),
+             Comment.objects.count()),
+            (SIZES['users'], SIZES['posts'], SIZES['comments']))
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('posts_count'))['total'],
+            SIZES['posts'])
+        self.assertEqual(
+            UserStats.objects.aggregate(total=Sum('followers_count'))
+            ['total'], Follow.objects.count())
+        user = User.objects.first()
+        self.assertTrue(Client().login(username=user.username,
+                                       password='secret'))
+
+    def test_power_law_authors(self):
+        self.run_seed()
+        counts = sorted(UserStats.objects.values_list(
+            'posts_count', flat=True), reverse=True)
+        self.assertGreater(counts[0], 5 * counts[len(counts) // 2])
+
+    def test_reproducible(self):
+        self.run_seed(seed=7)
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True))
+        self.run_seed(seed=7)
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', flat=True))[len(first):]
+        self.assertEqual(first, second)
+
+    @override_settings(FOLLOW_FEED_BACKFILL=5, FOLLOW_FEED_FANOUT_LIMIT=3)
+    def test_timeline_rebuild_matches_backfill(self):
+        """Сборка лент одним запросом даёт то же, что backfill()."""
+        self.run_seed()
+
+        def entries():
+            return set(TimelineEntry.objects.values_list('user', 'post'))
+
+        rebuilt = entries()
+        TimelineEntry.objects.all().delete()
+        for user_id, author_id in Follow.objects.values_list(
+                'user_id', 'author_id'):
+            timeline.backfill(user_id, author_id)
+        self.assertTrue(rebuilt)
+        self.assertEqual(rebuilt, entries())
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template import Context, Engine, Template
+from django.template.backends.django import DjangoTemplates
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.loaders import template_loaders, warm_up
+
+from ..models import Group, Post
+
+
+User = get_user_model()
+
+
+class TemplateLoadingTests(TestCase):
+    def test_warm_up_compiles_templates_once(self):
+        """Прогретый кеширующий загрузчик не разбирает шаблоны заново."""
+        engine = DjangoTemplates({
+            'NAME': 'cached',
+            'DIRS': settings.TEMPLATES[0]['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {'loaders': template_loaders(cached=True)},
+        }).engine
+        self.assertGreater(warm_up(engine), 0)
+        loader = engine.template_loaders[0]
+        template = engine.get_template('includes/paginator.html')
+        self.assertIs(engine.get_template('includes/paginator.html'),
+                      template)
+        self.assertIn('includes/paginator.html', loader.get_template_cache)
+
+    def test_warm_up_skipped_without_cached_loader(self):
+        engine = Engine(loaders=template_loaders(cached=False))
+        self.assertEqual(warm_up(engine), 0)
+
+
+@override_settings(TEMPLATE_PROFILING=True)
+class TemplateProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        Post.objects.create(author=cls.author, text='Тестовый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_lists_templates(self):
+        response = Client().get(reverse('all_posts:index'))
+        timing = response['Server-Timing']
+        for name in ('posts/index.html', 'base.html',
+                     'includes/paginator.html'):
+            with self.subTest(name=name):
+                self.assertIn(f'desc="{name} x', timing)
+
+    @override_settings(TEMPLATE_PROFILING=False)
+    def test_disabled_by_setting(self):
+        response = Client().get(reverse('all_posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+
+class PostCardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='has.no+name@mail')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='<b>Пост</b>')
+
+    def test_card_links_match_reverse(self):
+        html = Template(
+            '{% load post_cards %}{% post_card post group=True %}'
+        ).render(Context({'post': self.post}))
+        for url in (
+            reverse('all_posts:profile', args=[self.author.username]),
+            reverse('all_posts:post_detail', args=[self.post.pk]),
+            reverse('all_posts:group_list', args=[self.group.slug]),
+        ):
+            with self.subTest(url=url):
+                self.assertIn(f'href="{url}"', html)
+        self.assertIn('&lt;b&gt;Пост&lt;/b&gt;', html)
+
+    def test_card_flags(self):
+        html = Template(
+            '{% load post_cards %}'
+            '{% post_card post author=False detail=False %}'
+        ).render(Context({'post': self.post}))
+        self.assertNotIn('href=', html)
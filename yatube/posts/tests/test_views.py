@@ -1,14 +1,21 @@
 import shutil
 import tempfile
+from datetime import datetime, timedelta
+from unittest import mock
 
 from django import forms
 from django.core.cache import cache
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import DatabaseError, connection
 from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
+from .. import timeline
 from ..models import Group, Post, Comment, Follow
+from .utils import on_commit_callbacks
 
 
 User = get_user_model()
@@ -126,7 +133,7 @@ class PostsPagesTests(TestCase):
         """Кэширование работает правильно на главной странице."""
         response = self.authorized_client.get(reverse('all_posts:index'))
         content = response.content
-        Post.objects.all().delete()
+        Post.objects.update(text='Изменено в обход сигналов')
 
         response = self.authorized_client.get(reverse('all_posts:index'))
         self.assertEqual(content, response.content)
@@ -135,6 +142,44 @@ class PostsPagesTests(TestCase):
         response = self.authorized_client.get(reverse('all_posts:index'))
         self.assertNotEqual(content, response.content)
 
+    def test_feed_cache_is_invalidated_by_post_changes(self):
+        """Сохранение и удаление поста сбрасывает кеш его лент,
+        но не чужих."""
+        other_group = Group.objects.create(
+            title='Другая группа', slug='other-slug', description='-')
+        urls = {
+            'index': reverse('all_posts:index'),
+            'group': reverse('all_posts:group_list',
+                             kwargs={'slug': self.group.slug}),
+            'profile': reverse('all_posts:profile',
+                               kwargs={'username': self.author}),
+            'other_group': reverse('all_posts:group_list',
+                                   kwargs={'slug': other_group.slug}),
+        }
+        before = {
+            name: self.author_client.get(url).content
+            for name, url in urls.items()
+        }
+        self.assertNotEqual(
+            before['index'],
+            self.author_client.get(urls['index'] + '?page=2').content)
+
+        with on_commit_callbacks(execute=False) as callbacks:
+            Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(
+            self.author_client.get(urls['index']).content, before['index'],
+            'до коммита версия ленты не меняется')
+        for callback in callbacks:
+            callback()
+        after = {
+            name: self.author_client.get(url).content
+            for name, url in urls.items()
+        }
+        for name in ('index', 'group', 'profile'):
+            with self.subTest(feed=name):
+                self.assertNotEqual(before[name], after[name])
+        self.assertEqual(before['other_group'], after['other_group'])
+
     def test_follow_on_author(self):
         """Новая запись пользователя не видна тем,
         кто на него не подписан."""
@@ -216,3 +261,311 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(
                     len(response.context['page_obj']),
                     self.author.posts.count() - settings.PAGE_COUNT)
+
+    def test_cursor_paginator(self):
+        """Курсоры next/previous листают ленту без пропусков и повторов."""
+        page_names = [
+            reverse('all_posts:index'),
+            reverse('all_posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('all_posts:profile', kwargs={'username': self.author}),
+        ]
+        for page in page_names:
+            with self.subTest(page=page):
+                cache.clear()
+                first_page = self.client.get(page).context['page_obj']
+                response = self.client.get(
+                    page, {'cursor': first_page.next_cursor})
+                second_page = response.context['page_obj']
+                self.assertEqual(second_page.number, 2)
+                self.assertIsNone(second_page.next_cursor)
+                self.assertEqual(
+                    [post.pk for post in second_page],
+                    [post.pk for post in
+                     self.client.get(page + '?page=2').context['page_obj']])
+
+                response = self.client.get(
+                    page, {'cursor': second_page.previous_cursor})
+                self.assertEqual(response.context['page_obj'].number, 1)
+                self.assertEqual(
+                    [post.pk for post in response.context['page_obj']],
+                    [post.pk for post in first_page])
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.client.get(
+            reverse('all_posts:index'), {'cursor': 'garbage'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+
+    @override_settings(PAGE_COUNT=1)
+    def test_page_links_are_windowed(self):
+        """Ссылки только вокруг текущей страницы и по краям."""
+        cache.clear()
+        response = self.client.get(reverse('all_posts:index'), {'page': 6})
+        self.assertEqual(response.context['page_range'],
+                         [1, '…', 4, 5, 6, 7, 8, '…', 11])
+        self.assertNotContains(response, '?page=2"')
+
+    @override_settings(PAGE_COUNT=2)
+    def test_page_links_use_cursors(self):
+        """Страницы вокруг текущей открываются курсором, а края —
+        номером, и это те же страницы, что по ?page=."""
+        cache.clear()
+        url = reverse('all_posts:index')
+        response = self.client.get(url, {'page': 4})
+        links = dict(response.context['page_links'])
+        self.assertEqual(sorted(links), [1, 2, 3, 4, 5, 6])
+        self.assertIsNone(links[1])
+        self.assertIsNone(links[6])
+        for number in (2, 3, 5):
+            with self.subTest(number=number):
+                by_cursor = self.client.get(
+                    url, {'cursor': links[number]}).context['page_obj']
+                by_number = self.client.get(
+                    url, {'page': number}).context['page_obj']
+                self.assertEqual(by_cursor.number, number)
+                self.assertEqual([post.pk for post in by_cursor],
+                                 [post.pk for post in by_number])
+        last_page = self.client.get(url, {'page': 6}).context['page_obj']
+        self.assertEqual([post.pk for post in last_page],
+                         [Post.objects.order_by('pk')[0].pk])
+        self.assertIsNone(last_page.next_cursor)
+
+    @override_settings(PAGE_COUNT=2)
+    def test_jump_to_date(self):
+        """?date= открывает ленту с постов этого дня."""
+        base = datetime(2024, 1, 20, 12, tzinfo=timezone.utc)
+        for days, post in enumerate(Post.objects.order_by('-pk')):
+            Post.objects.filter(pk=post.pk).update(
+                pub_date=base - timedelta(days=days))
+        cache.clear()
+        response = self.client.get(reverse('all_posts:index'),
+                                   {'date': '2024-01-17'})
+        page_obj = response.context['page_obj']
+        self.assertEqual(page_obj.number, 2)
+        self.assertEqual([post.pub_date for post in page_obj],
+                         [base - timedelta(days=3), base - timedelta(days=4)])
+        self.assertIsNotNone(page_obj.previous_cursor)
+        self.assertContains(response, 'value="2024-01-17"')
+
+        response = self.client.get(reverse('all_posts:index'),
+                                   {'date': '2000-01-01'})
+        self.assertEqual(response.context['page_obj'].number,
+                         response.context['page_obj'].paginator.num_pages)
+        for date in ('garbage', '2024-13-01', '9999-12-31'):
+            with self.subTest(date=date):
+                response = self.client.get(reverse('all_posts:index'),
+                                           {'date': date})
+                self.assertEqual(response.context['page_obj'].number, 1)
+
+
+class FollowFeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.celebrity = User.objects.create_user(username='celebrity')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=cls.fan, author=cls.celebrity)
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_feed(self):
+        response = self.reader_client.get(reverse('all_posts:follow_index'))
+        return [post.text for post in response.context['page_obj']]
+
+    def test_posts_are_fanned_out_to_followers(self):
+        """Посты раскладываются по лентам подписчиков и убираются
+        из них после отписки."""
+        Post.objects.create(author=self.author, text='до подписки')
+        self.reader_client.get(reverse(
+            'all_posts:profile_follow', kwargs={'username': self.author}))
+        Post.objects.create(author=self.author, text='после подписки')
+        self.assertEqual(self.reader.timeline.count(), 2)
+        self.assertEqual(self.follow_feed(),
+                         ['после подписки', 'до подписки'])
+
+        self.reader_client.get(reverse(
+            'all_posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(self.reader.timeline.exists())
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=1)
+    def test_celebrity_posts_are_pulled_on_read(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=self.celebrity)
+        Post.objects.create(author=self.celebrity, text='знаменитость')
+        Post.objects.create(author=self.author, text='автор')
+        self.assertEqual(
+            list(self.reader.timeline.values_list('post__text', flat=True)),
+            ['автор'])
+        self.assertEqual(self.follow_feed(), ['автор', 'знаменитость'])
+
+    @override_settings(FOLLOW_FEED_FANOUT_LIMIT=1)
+    def test_posts_of_former_celebrity_stay_in_feed(self):
+        """Посты, вышедшие, пока автор был знаменитостью, остаются
+        в лентах, когда подписчиков становится меньше."""
+        Follow.objects.create(user=self.reader, author=self.celebrity)
+        Post.objects.create(author=self.celebrity, text='знаменитость')
+        self.assertFalse(self.reader.timeline.exists())
+        Follow.objects.get(user=self.fan).delete()
+        self.assertEqual(
+            list(self.reader.timeline.values_list('post__text', flat=True)),
+            ['знаменитость'])
+        self.assertEqual(self.follow_feed(), ['знаменитость'])
+
+    @override_settings(PAGE_COUNT=2)
+    def test_cached_count_does_not_hide_new_posts(self):
+        """Число постов ленты подписок кешируется, но новые посты видны
+        сразу, и на полной странице есть ссылка дальше."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.follow_feed(), [])
+        Post.objects.create(author=self.author, text='первый')
+        self.assertEqual(self.follow_feed(), ['первый'])
+        Post.objects.create(author=self.author, text='второй')
+        Post.objects.create(author=self.author, text='третий')
+        response = self.reader_client.get(reverse('all_posts:follow_index'))
+        page_obj = response.context['page_obj']
+        self.assertEqual([post.text for post in page_obj],
+                         ['третий', 'второй'])
+        self.assertIsNotNone(page_obj.next_cursor)
+
+    def test_rebuild_keeps_feeds_when_insert_fails(self):
+        """Ленты пересобираются в одной транзакции: при ошибке вставки
+        старые записи остаются на месте."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.create(author=self.author, text='пост')
+        Follow.objects.filter(user=self.reader).update(author=self.fan)
+        with mock.patch.object(Follow._meta, 'db_table', 'missing'), \
+                self.assertRaises(DatabaseError):
+            timeline.rebuild()
+        self.assertEqual(self.follow_feed(), ['пост'])
+        timeline.rebuild()
+        self.assertEqual(self.follow_feed(), [])
+
+    @override_settings(PAGE_COUNT=2)
+    def test_feed_pages_over_timeline(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(5):
+            Post.objects.create(author=self.author, text=f'пост {i}')
+        url = reverse('all_posts:follow_index')
+        texts = []
+        response = self.reader_client.get(url)
+        while True:
+            page_obj = response.context['page_obj']
+            self.assertTrue(all(isinstance(post, Post) for post in page_obj))
+            texts += [post.text for post in page_obj]
+            if not page_obj.next_cursor:
+                break
+            response = self.reader_client.get(
+                url, {'cursor': page_obj.next_cursor})
+        self.assertEqual(texts, [f'пост {i}' for i in range(4, -1, -1)])
+
+
+class FeedQueryCountTest(TestCase):
+    POST_COUNT = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='HasNoName', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(cls.POST_COUNT):
+            Post.objects.create(
+                author=cls.author,
+                text=f'Тестовый пост {i}',
+                group=cls.group,
+            )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def count_queries(self, url, page_count):
+        cache.clear()
+        with self.settings(PAGE_COUNT=page_count):
+            with CaptureQueriesContext(connection) as context:
+                response = self.reader_client.get(url)
+        self.assertEqual(len(response.context['page_obj']), page_count)
+        return len(context.captured_queries)
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        """Число запросов ленты не зависит от числа постов на странице."""
+        page_names = [
+            reverse('all_posts:index'),
+            reverse('all_posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('all_posts:profile', kwargs={'username': self.author}),
+            reverse('all_posts:follow_index'),
+        ]
+        for page in page_names:
+            with self.subTest(page=page):
+                self.reader_client.get(page)
+                # На обеих страницах есть ссылки вперёд по курсору.
+                self.assertEqual(
+                    self.count_queries(page, 2),
+                    self.count_queries(page, self.POST_COUNT // 4))
+
+
+@override_settings(COMMENTS_PAGE_COUNT=3)
+class CommentsPageTest(TestCase):
+    COMMENT_COUNT = 7
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='HasNoName')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        for i in range(cls.COMMENT_COUNT):
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{i}'),
+                text=f'Комментарий {i}',
+            )
+        cls.detail_url = reverse('all_posts:post_detail',
+                                 kwargs={'post_id': cls.post.pk})
+        cls.more_url = reverse('all_posts:post_comments',
+                               kwargs={'post_id': cls.post.pk})
+
+    def comment_texts(self, response):
+        return [comment.text for comment in response.context['comments']]
+
+    def test_comments_are_paginated_by_cursor(self):
+        """Кнопка «Показать ещё» отдаёт следующие комментарии до конца."""
+        response = self.client.get(self.detail_url)
+        texts = self.comment_texts(response)
+        while response.context['comments'].next_cursor:
+            response = self.client.get(self.more_url, {
+                'cursor': response.context['comments'].next_cursor})
+            self.assertTemplateUsed(response, 'includes/comments.html')
+            texts += self.comment_texts(response)
+        self.assertEqual(texts, [f'Комментарий {i}' for i in
+                                 reversed(range(self.COMMENT_COUNT))])
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_detail_without_js_continues_from_cursor(self):
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(self.detail_url,
+                                   {'comments': first.next_cursor})
+        self.assertEqual(self.comment_texts(response),
+                         ['Комментарий 3', 'Комментарий 2', 'Комментарий 1'])
+
+    def test_comment_queries_do_not_grow_with_page_size(self):
+        """Авторы комментариев приходят тем же запросом."""
+        counts = []
+        for page_count in (1, self.COMMENT_COUNT):
+            with self.settings(COMMENTS_PAGE_COUNT=page_count):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(self.detail_url)
+            self.assertEqual(len(response.context['comments']), page_count)
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_comment_without_author(self):
+        Comment.objects.filter(post=self.post).update(author=None)
+        response = self.client.get(self.detail_url)
+        self.assertContains(response, 'Комментарий 6')
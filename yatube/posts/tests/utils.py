@@ -0,0 +1,22 @@
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+@contextmanager
+def on_commit_callbacks(using=DEFAULT_DB_ALIAS, execute=True):
+    """Выполняет колбэки transaction.on_commit, поставленные в блоке.
+
+    TestCase не коммитит транзакцию, и сами они не сработают; это
+    TestCase.captureOnCommitCallbacks() из Django 3.2.
+    """
+    callbacks = []
+    start = len(connections[using].run_on_commit)
+    try:
+        yield callbacks
+    finally:
+        callbacks[:] = [func for sids, func in
+                        connections[using].run_on_commit[start:]]
+        if execute:
+            for callback in callbacks:
+                callback()
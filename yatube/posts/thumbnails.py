@@ -0,0 +1,205 @@
+"""Миниатюры картинок постов.
+
+Картинка поста отдаётся набором ширин POST_IMAGE_WIDTHS, не шире
+оригинала, в JPEG и в современных форматах, которые умеет сохранять
+Pillow (WebP, AVIF).
+Когда у поста меняется картинка, она ставится в очередь ThumbnailJob;
+отдельный процесс pregenerate_thumbnails --queue строит все варианты
+и кладёт их в хранилище ключей sorl-thumbnail, так что шаблоны
+не декодируют оригинал в запросе.
+Записи о миниатюрах всех постов страницы prefetch() достаёт из
+хранилища ключей одним запросом.
+"""
+import logging
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post, ThumbnailJob
+
+
+logger = logging.getLogger(__name__)
+
+
+FALLBACK_FORMAT = 'JPEG'
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+
+
+@lru_cache(maxsize=None)
+def can_encode(format_):
+    """Pillow не просто знает формат, а правда умеет в него записать:
+    плагин может быть зарегистрирован и без собранного кодека."""
+    try:
+        Image.new('RGB', (1, 1)).save(BytesIO(), format_)
+    except Exception:
+        return False
+    return True
+
+
+def modern_formats():
+    """Современные форматы, которые умеют записать и Pillow, и sorl."""
+    return [format_ for format_ in ('AVIF', 'WEBP')
+            if format_ in EXTENSIONS and can_encode(format_)]
+
+
+def geometry(width):
+    return f'{width}x{round(width / settings.POST_IMAGE_RATIO)}'
+
+
+def variant(width, format_):
+    return geometry(width), {
+        'crop': 'center', 'upscale': True, 'format': format_}
+
+
+def image_variants(source_width=None):
+    """Пары (геометрия, опции sorl) для вариантов картинки поста.
+
+    Если ширина оригинала известна, варианты шире него не выдаются:
+    растянутая картинка весит больше, а чётче не становится. Вместо
+    них берётся сама ширина оригинала.
+    """
+    widths = settings.POST_IMAGE_WIDTHS
+    if source_width is not None and source_width < max(widths):
+        widths = sorted({width for width in widths if width < source_width}
+                        | {source_width})
+    for format_ in (*modern_formats(), FALLBACK_FORMAT):
+        for width in widths:
+            yield variant(width, format_)
+
+
+def fallback_variant():
+    """Вариант для src у <img>, если браузер не понял srcset."""
+    return variant(settings.POST_IMAGE_DEFAULT_WIDTH, FALLBACK_FORMAT)
+
+
+def thumbnail_file(image, geometry_string, options):
+    """ImageFile миниатюры с тем же именем, что даст get_thumbnail(),
+    но без обращения к хранилищу ключей и к файлам."""
+    backend = default.backend
+    options = dict(options)
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(
+        ImageFile(image), geometry_string, options)
+    return ImageFile(name, default.storage)
+
+
+def prefetch(images):
+    """Готовые миниатюры картинок одним запросом к хранилищу ключей.
+
+    Возвращает {(имя картинки, геометрия, формат): ImageFile} и записи
+    об оригиналах с их размером под ключом {имя картинки: ImageFile};
+    чего в хранилище нет, в словарь не попадает. Второй запрос нужен
+    только для оригиналов меньше самой большой ширины: их вариант
+    по ширине оригинала заранее не известен.
+    """
+    images = [image for image in images if image]
+    files = {}
+    for image in images:
+        files[image.name] = ImageFile(image)
+        for geometry_string, options in (*image_variants(),
+                                         fallback_variant()):
+            files[image.name, geometry_string, options['format']] = (
+                thumbnail_file(image, geometry_string, options))
+    found = get_many(files)
+    narrow = {}
+    for image in images:
+        source = found.get(image.name)
+        if source is None or not source.size:
+            continue
+        for geometry_string, options in image_variants(source.width):
+            key = image.name, geometry_string, options['format']
+            if key not in files:
+                narrow[key] = thumbnail_file(image, geometry_string, options)
+    if narrow:
+        found.update(get_many(narrow))
+    return found
+
+
+def get_many(files):
+    """{ключ: ImageFile} для записей {ключ: ImageFile}, найденных
+    в хранилище ключей."""
+    kvstore = default.kvstore
+    if hasattr(kvstore, 'get_many'):
+        found = kvstore.get_many(files.values())
+    else:
+        found = {file.key: kvstore.get(file) for file in files.values()}
+    return {key: found[file.key] for key, file in files.items()
+            if found.get(file.key)}
+
+
+def sized_source(image):
+    """Запись об оригинале в хранилище ключей вместе с его размером."""
+    source = default.kvstore.get(ImageFile(image)) or ImageFile(image)
+    if not source.size:
+        # Если файл миниатюры уже был, sorl записал оригинал без размера.
+        source.set_size()
+        default.kvstore.set(source)
+    return source
+
+
+def pregenerate(image):
+    """Строит все варианты миниатюр для файла картинки.
+
+    Первой строится миниатюра для src: заодно в хранилище ключей
+    попадает размер оригинала, по которому отбираются ширины.
+    """
+    geometry_string, options = fallback_variant()
+    try:
+        get_thumbnail(image, geometry_string, **options)
+        source = sized_source(image)
+    except Exception:
+        logger.exception('Не удалось построить миниатюру для %s',
+                         image.name)
+        return
+    for geometry_string, options in image_variants(source.width):
+        try:
+            get_thumbnail(image, geometry_string, **options)
+        except Exception:
+            logger.exception('Не удалось построить миниатюру %s для %s',
+                             geometry_string, image.name)
+
+
+def schedule(image):
+    """Ставит нарезку миниатюр картинки в очередь.
+
+    Без THUMBNAIL_PREGENERATE_ASYNC миниатюры строятся сразу.
+    """
+    if not settings.THUMBNAIL_PREGENERATE_ASYNC:
+        pregenerate(image)
+        return
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(name=image.name)], ignore_conflicts=True)
+
+
+def process_queue(batch_size=100):
+    """Строит миниатюры для картинок из очереди, пока она не опустеет.
+
+    Возвращает число обработанных картинок.
+    """
+    storage = Post._meta.get_field('image').storage
+    done = 0
+    while True:
+        jobs = list(ThumbnailJob.objects.order_by('pk')[:batch_size])
+        if not jobs:
+            return done
+        for job in jobs:
+            pregenerate(ImageFile(job.name, storage))
+        ThumbnailJob.objects.filter(
+            pk__in=[job.pk for job in jobs]).delete()
+        done += len(jobs)
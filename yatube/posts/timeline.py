@@ -0,0 +1,153 @@
+"""Лента подписок, собираемая при публикации (fan-out on write).
+
+Новый пост сразу раскладывается по TimelineEntry подписчиков автора,
+и страница /follow/ листает записи пользователя одним диапазоном
+индекса (user, -pub_date, -post), подтягивая посты JOIN по первичному
+ключу.
+Посты авторов, у которых подписчиков больше FOLLOW_FEED_FANOUT_LIMIT,
+не раскладываются: их посты добираются из Post при чтении.
+"""
+from operator import attrgetter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+
+from .counters import BATCH_SIZE, follow_feed
+from .models import Follow, Post, TimelineEntry, UserStats
+from .utils import get_page_context
+
+
+def is_celebrity(author_id):
+    return UserStats.objects.filter(
+        pk=author_id,
+        followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+def add_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Добавляет новый пост в ленты подписчиков автора."""
+    if not settings.FOLLOW_FEED_FANOUT or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    add_entries(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Переносит последние посты автора в ленту нового подписчика."""
+    if not settings.FOLLOW_FEED_FANOUT or is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('pk', 'pub_date')
+    add_entries(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts[:settings.FOLLOW_FEED_BACKFILL]
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты отписавшегося пользователя."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def reassign(post):
+    """Переносит пост, сменивший автора, в ленты подписчиков нового."""
+    TimelineEntry.objects.filter(post=post).delete()
+    fan_out(post)
+
+
+def catch_up(author_id):
+    """Раскладывает посты автора, переставшего быть знаменитостью.
+
+    Пока подписчиков было больше FOLLOW_FEED_FANOUT_LIMIT, его посты
+    не попадали в ленты; без этого они пропали бы из них, как только
+    автор опустился до предела.
+    """
+    if not settings.FOLLOW_FEED_FANOUT or not UserStats.objects.filter(
+            pk=author_id,
+            followers_count=settings.FOLLOW_FEED_FANOUT_LIMIT).exists():
+        return
+    posts = list(Post.objects.filter(author_id=author_id).order_by(
+        '-pub_date').values_list('pk', 'pub_date')[
+            :settings.FOLLOW_FEED_BACKFILL])
+    followers = Follow.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    add_entries(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for user_id in followers.iterator()
+        for pk, pub_date in posts
+    )
+
+
+def follow_posts(user):
+    """Посты авторов, на которых подписан пользователь, без ленты."""
+    if not settings.FOLLOW_FEED_FANOUT:
+        return Post.objects.filter(author__following__user=user)
+    celebrities = list(Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FOLLOW_FEED_FANOUT_LIMIT,
+    ).values_list('author_id', flat=True))
+    if not celebrities:
+        return None
+    return Post.objects.filter(
+        Q(pk__in=user.timeline.values('post_id'))
+        | Q(author_id__in=celebrities)
+    )
+
+
+def follow_page_context(request):
+    """Страница ленты подписок, как get_page_context().
+
+    Обычно листаются записи ленты по ключу (pub_date, post_id), а на
+    страницу попадают их посты. Посты знаменитостей в ленте не лежат:
+    тому, кто подписан на них, посты выбираются из Post.
+    """
+    user = request.user
+    posts = follow_posts(user)
+    if posts is not None:
+        return get_page_context(posts.feed(), request,
+                                feed=follow_feed(user.pk))
+    return get_page_context(
+        user.timeline.feed(), request, feed=follow_feed(user.pk),
+        keys=('pub_date', 'post_id'), item=attrgetter('post'))
+
+
+def rebuild():
+    """Собирает ленты подписок заново по текущим подпискам.
+
+    Одним INSERT … SELECT: последние FOLLOW_FEED_BACKFILL постов
+    каждого автора (ROW_NUMBER() по автору) для каждой подписки,
+    кроме авторов-знаменитостей, — как backfill(), но без запроса
+    на подписку. Счётчики подписчиков должны быть актуальны.
+    Старые записи удаляются тоже SQL: QuerySet.delete() из-за
+    приёмников post_delete читал бы их все в память. Удаление и вставка
+    идут в одной транзакции: никто не увидит пустых лент.
+    """
+    table = TimelineEntry._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table}')
+        if not settings.FOLLOW_FEED_FANOUT:
+            return
+        cursor.execute(
+            f'INSERT INTO {table} '
+            '(user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'LEFT JOIN {UserStats._meta.db_table} stats '
+            'ON stats.user_id = follow.author_id '
+            'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            f') AS position FROM {Post._meta.db_table}) post '
+            'ON post.author_id = follow.author_id AND post.position <= %s '
+            'WHERE COALESCE(stats.followers_count, 0) <= %s',
+            [settings.FOLLOW_FEED_BACKFILL, settings.FOLLOW_FEED_FANOUT_LIMIT])
@@ -0,0 +1,159 @@
+"""Приём картинок постов.
+
+Загрузка пишется на диск кусками и проверяется по ходу: на файле
+больше POST_IMAGE_MAX_UPLOAD_SIZE или картинке, у которой по заголовку
+больше POST_IMAGE_MAX_PIXELS точек, чтение тела запроса обрывается,
+и Pillow ничего не декодирует. Принятые оригиналы больше
+POST_IMAGE_MAX_SIDE уменьшаются при сохранении.
+"""
+import io
+from functools import wraps
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import (StopUpload,
+                                             TemporaryFileUploadHandler)
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from PIL import Image, ImageOps
+
+
+HEADER_LIMIT = 256 * 1024
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 90, 'optimize': True},
+    'WEBP': {'quality': 90},
+}
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, отброшенный при загрузке; error — причина для формы."""
+
+    def __init__(self, name, error):
+        super().__init__(io.BytesIO(), name=name, size=0)
+        self.error = error
+
+
+def header_error(head, complete):
+    """Проверяет картинку по первым байтам файла.
+
+    Возвращает текст ошибки, None для годной картинки и False,
+    если заголовок ещё не дочитан.
+    """
+    try:
+        with Image.open(io.BytesIO(head)) as image:
+            format_, (width, height) = image.format, image.size
+    except Image.DecompressionBombError:
+        return 'Слишком большое разрешение картинки.'
+    except Exception:
+        if complete or len(head) >= HEADER_LIMIT:
+            return ('Загрузите правильное изображение. Файл, который вы '
+                    'загрузили, поврежден или не является изображением.')
+        return False
+    if format_ not in ALLOWED_FORMATS:
+        return f'Формат {format_} не поддерживается.'
+    if width * height > settings.POST_IMAGE_MAX_PIXELS:
+        return (f'Слишком большое разрешение картинки: {width}x{height}. '
+                f'Допустимо не больше '
+                f'{settings.POST_IMAGE_MAX_PIXELS // 10 ** 6} Мп.')
+    return None
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку во временный файл и проверяет её на лету.
+
+    Отброшенный файл попадает в rejected, а остаток запроса
+    не читается: StopUpload(connection_reset=True).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rejected = {}
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = bytearray()
+        self.received = 0
+        self.checked = False
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_UPLOAD_SIZE:
+            self.reject('Файл больше {}.'.format(
+                filesizeformat(settings.POST_IMAGE_MAX_UPLOAD_SIZE)))
+        if not self.checked:
+            self.head += raw_data[:HEADER_LIMIT - len(self.head)]
+            self.check(complete=False)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if not self.checked:
+            self.check(complete=True)
+        return super().file_complete(file_size)
+
+    def check(self, complete):
+        error = header_error(bytes(self.head), complete)
+        if error is False:
+            return
+        self.checked = True
+        self.head = None
+        if error:
+            self.reject(error)
+
+    def reject(self, error):
+        self.file.close()
+        self.rejected[self.field_name] = RejectedUpload(self.file_name, error)
+        raise StopUpload(connection_reset=True)
+
+
+def accept_images(view):
+    """Принимает файлы запроса к view через ImageUploadHandler.
+
+    Обработчики загрузки меняются до того, как прочитано тело запроса,
+    а CsrfViewMiddleware читает его раньше view, поэтому CSRF-токен
+    проверяется здесь же, после замены. Отброшенные файлы попадают
+    в request.FILES как RejectedUpload, и форма показывает причину.
+    """
+    protected = csrf_protect(view)
+
+    @csrf_exempt
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        handler = ImageUploadHandler(request)
+        request.upload_handlers = [handler]
+        files = request.FILES
+        for name, upload in handler.rejected.items():
+            files.appendlist(name, upload)
+        return protected(request, *args, **kwargs)
+
+    return wrapper
+
+
+def shrink(uploaded):
+    """Уменьшает оригинал до POST_IMAGE_MAX_SIDE по большей стороне.
+
+    JPEG декодируется сразу в уменьшенном масштабе (draft), поэтому
+    40-мегапиксельное фото не разворачивается в памяти целиком.
+    Уменьшенная картинка записывается поверх временного файла загрузки.
+    Анимированные картинки и небольшие оригиналы не трогаются.
+    """
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    uploaded.seek(0)
+    with Image.open(uploaded) as original:
+        if (max(original.size) <= max_side
+                or getattr(original, 'is_animated', False)):
+            uploaded.seek(0)
+            return uploaded
+        format_ = original.format
+        original.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    if format_ == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    uploaded.seek(0)
+    uploaded.truncate()
+    image.save(uploaded, format_, **SAVE_OPTIONS.get(format_, {}))
+    uploaded.size = uploaded.tell()
+    uploaded.seek(0)
+    return uploaded
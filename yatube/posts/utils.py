@@ -1,11 +1,312 @@
+import json
+from datetime import date, datetime, time, timedelta
+from functools import partial
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .caching import feed_cache
+from .counters import feed_count
+
+
+class InvalidCursor(Exception):
+    """Курсор страницы повреждён или подделан."""
+
+
+def encode_cursor(number, values, backwards=False):
+    """Упаковывает позицию в ленте в непрозрачный токен для ?cursor=."""
+    values = [value.isoformat() if isinstance(value, datetime) else value
+              for value in values]
+    payload = [number, values, int(backwards)]
+    return urlsafe_base64_encode(json.dumps(payload).encode())
+
+
+def decode_value(value):
+    if isinstance(value, str):
+        value = parse_datetime(value)
+        if value is None:
+            raise ValueError
+    elif not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError
+    return value
+
+
+def decode_cursor(cursor, size):
+    try:
+        number, values, backwards = json.loads(
+            urlsafe_base64_decode(cursor).decode())
+        number = int(number)
+        values = [decode_value(value) for value in values]
+    except (TypeError, ValueError):
+        raise InvalidCursor(cursor)
+    if number < 1 or len(values) != size:
+        raise InvalidCursor(cursor)
+    return number, values, bool(backwards)
+
+
+def after(keys, values, backwards=False):
+    """Условие «дальше по ключу keys, чем values» при сортировке по убыванию.
+
+    Для ключа (a, b): a < va OR (a = va AND b < vb); backwards — в
+    обратную сторону.
+    """
+    lookup = 'gt' if backwards else 'lt'
+    condition = Q()
+    for size in range(len(keys), 0, -1):
+        equal = dict(zip(keys[:size - 1], values[:size - 1]))
+        condition |= Q(**equal, **{
+            f'{keys[size - 1]}__{lookup}': values[size - 1]})
+    return condition
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу, по умолчанию (pub_date, id).
+
+    Записи идут по убыванию ключа. Соседние страницы выбираются условием
+    по ключу крайней записи текущей страницы, а не через OFFSET, поэтому
+    стоимость запроса не зависит от того, насколько глубоко листают ленту.
+    item — функция, превращающая выбранную строку в элемент страницы:
+    курсоры строятся по строкам, а в page.object_list идут элементы.
+    """
+
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, count_provider=None,
+                 keys=('pub_date', 'pk'), item=None, **kwargs):
+        self.keys = keys
+        self.item = item
+        super().__init__(
+            object_list.order_by(*(f'-{key}' for key in keys)), per_page,
+            **kwargs)
+        self.count_provider = count_provider
+
+    @cached_property
+    def count(self):
+        if self.count_provider is None:
+            return super().count
+        return self.count_provider()
+
+    def page(self, number):
+        """Страница по номеру.
+
+        Число записей из count_provider может отставать от ленты, поэтому
+        срез ему не подрезается: выбирается per_page + 1 строка, и есть ли
+        следующая страница, решает лишняя строка. Число нужно только для
+        номеров страниц.
+        """
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if number > 1 and number == self.num_pages:
+            # Последняя страница выбирается с другого конца индекса.
+            rows = list(self.object_list.order_by(*self.keys)[
+                :self.count - bottom])
+            rows.reverse()
+            has_more = False
+        else:
+            rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+            has_more = len(rows) > self.per_page
+        page = self._get_page(rows[:self.per_page], number, self)
+        page.cursor = None
+        self._set_cursors(page, number > 1, has_more)
+        self._set_items(page)
+        return page
+
+    def cursor_page(self, cursor):
+        """Страница, соседняя с записью, закодированной в курсоре."""
+        number, values, backwards = decode_cursor(cursor, len(self.keys))
+        rows = self.object_list.filter(after(self.keys, values, backwards))
+        if backwards:
+            rows = rows.order_by(*self.keys)
+        rows = list(rows[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            if not has_more:
+                number = 1
+            page = self._get_page(rows, number, self)
+            self._set_cursors(page, has_more, True)
+        else:
+            page = self._get_page(rows, number, self)
+            self._set_cursors(page, True, has_more)
+        page.cursor = cursor
+        self._set_items(page)
+        return page
+
+    def get_cursor_page(self, cursor):
+        """Как get_page(): при битом курсоре отдаёт первую страницу."""
+        try:
+            return self.cursor_page(cursor)
+        except InvalidCursor:
+            return self.page(1)
+
+    def date_cursor(self, day):
+        """Курсор страницы, с которой начинаются записи не новее дня day.
+
+        Ключ сортировки должен начинаться с даты. Номер страницы
+        считается по числу более новых записей: это подсчёт по диапазону
+        индекса на дату, а сама страница выбирается по ключу, без OFFSET.
+        """
+        end = timezone.make_aware(
+            datetime.combine(day + timedelta(days=1), time.min))
+        newer = self.object_list.filter(**{
+            f'{self.keys[0]}__gte': end}).count()
+        return encode_cursor(newer // self.per_page + 1,
+                             [end] + [0] * (len(self.keys) - 1))
+
+    def get_elided_page_range(self, number=1, on_each_side=2, on_ends=1):
+        """Номера страниц вокруг number и по краям, пропуски — ELLIPSIS.
+
+        Как Paginator.get_elided_page_range() из Django 3.2: число
+        ссылок не зависит от длины ленты.
+        """
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+    def page_links(self, page, numbers):
+        """Пары (номер, курсор) для ссылок на страницы numbers.
+
+        Страницы вокруг page открываются курсором: ключи записей между
+        ними выбираются по индексу от краёв page, не больше per_page
+        на каждую промежуточную страницу. Первая и последняя страницы
+        остаются номерами: page() выбирает их без глубокого OFFSET.
+        """
+        pages = [number for number in numbers if number != self.ELLIPSIS]
+        forward = [number - page.number for number in pages
+                   if page.number < number < self.num_pages]
+        backward = [page.number - number for number in pages
+                    if 1 < number < page.number]
+        cursors = {}
+        if forward and page.last_key is not None:
+            keys = [page.last_key] + self._keys_after(
+                page.last_key, (max(forward) - 1) * self.per_page)
+            for distance in forward:
+                index = (distance - 1) * self.per_page
+                if index < len(keys):
+                    cursors[page.number + distance] = encode_cursor(
+                        page.number + distance, keys[index])
+        if backward and page.first_key is not None:
+            keys = [page.first_key] + self._keys_after(
+                page.first_key, (max(backward) - 1) * self.per_page,
+                backwards=True)
+            for distance in backward:
+                index = (distance - 1) * self.per_page
+                if index < len(keys):
+                    cursors[page.number - distance] = encode_cursor(
+                        page.number - distance, keys[index], backwards=True)
+        return [(number, cursors.get(number)) for number in numbers]
+
+    def _keys_after(self, values, size, backwards=False):
+        """Ключи size записей за values, ближние первыми."""
+        if not size:
+            return []
+        rows = self.object_list.filter(after(self.keys, values, backwards))
+        if backwards:
+            rows = rows.order_by(*self.keys)
+        return [list(row) for row in rows.values_list(*self.keys)[:size]]
+
+    def _set_cursors(self, page, has_previous, has_next):
+        page.previous_cursor = page.next_cursor = None
+        page.first_key = page.last_key = None
+        if not page.object_list:
+            return
+        first, last = page.object_list[0], page.object_list[-1]
+        page.first_key, page.last_key = self.key_of(first), self.key_of(last)
+        if has_previous and page.number > 1:
+            page.previous_cursor = encode_cursor(
+                page.number - 1, self.key_of(first), backwards=True)
+        if has_next:
+            page.next_cursor = encode_cursor(
+                page.number + 1, self.key_of(last))
+
+    def _set_items(self, page):
+        if self.item is not None:
+            page.object_list = [self.item(row) for row in page.object_list]
+
+    def key_of(self, obj):
+        return [getattr(obj, key) for key in self.keys]
+
+
+def get_page_context(queryset, request, feed=None, keys=('pub_date', 'pk'),
+                     count_provider=None, item=None):
+    """Страница ленты.
+
+    feed — ключ ленты: по нему число постов берётся из счётчиков,
+    а фрагмент шаблона кешируется с версией ленты. keys — ключ
+    сортировки по убыванию для CursorPaginator, count_provider —
+    функция, считающая записи вместо queryset.count(), item — как
+    в CursorPaginator.
+    Если ключ начинается с pub_date, ?date=ГГГГ-ММ-ДД открывает
+    ленту с постов этого дня.
+    """
+    context = {}
+    if feed is not None:
+        count_provider = partial(feed_count, feed, queryset)
+        context['feed_cache'] = feed_cache(feed)
+    paginator = CursorPaginator(
+        queryset, settings.PAGE_COUNT, count_provider=count_provider,
+        keys=keys, item=item)
+    context['date_jump'] = keys[0] == 'pub_date'
+    cursor = request.GET.get('cursor')
+    day = get_date(request.GET.get('date')) if context['date_jump'] else None
+    if day is not None:
+        page_obj = paginator.cursor_page(paginator.date_cursor(day))
+        if not page_obj.object_list:
+            page_obj = paginator.page(paginator.num_pages)
+        context['date'] = day
+    elif cursor:
+        page_obj = paginator.get_cursor_page(cursor)
+    else:
+        page_obj = paginator.get_page(request.GET.get('page'))
+    context['page_obj'] = page_obj
+    context['page_range'] = list(
+        paginator.get_elided_page_range(page_obj.number))
+    context['page_links'] = paginator.page_links(
+        page_obj, context['page_range'])
+    return context
+
+
+def get_date(value):
+    """Дата из ?date=, None если её нет или она неверна.
+
+    Для date.max следующего дня нет, и лента с неё — первая страница.
+    """
+    try:
+        day = parse_date(value or '')
+    except ValueError:
+        return None
+    return None if day == date.max else day
+
 
+def get_comments_page(post, cursor=None):
+    """Страница комментариев поста, от новых к старым.
 
-def get_page_context(queryset, request):
-    paginator = Paginator(queryset, settings.PAGE_COUNT)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return {
-        'page_obj': page_obj,
-    }
+    Листается по курсору на ключе (created, id), авторы подтягиваются
+    в том же запросе, а общее число берётся из post.comments_count.
+    """
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        settings.COMMENTS_PAGE_COUNT, keys=('created', 'pk'),
+        count_provider=lambda: post.comments_count)
+    if cursor:
+        return paginator.get_cursor_page(cursor)
+    return paginator.page(1)
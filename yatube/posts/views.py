@@ -1,64 +1,112 @@
+from urllib.parse import urlencode
+
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.pagecache import tag_page
+from core.replicas import replica_reads
+
+from .caching import post_page
+from .counters import INDEX_FEED, author_feed, group_feed
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import get_page_context
+from .models import Follow, Group, Post, PostSearch, User
+from .timeline import follow_page_context
+from .uploads import accept_images
+from .utils import get_comments_page, get_page_context
 
 
+@replica_reads
 def index(request):
+    tag_page(request, INDEX_FEED)
     context = {
         'index': True,
     }
     context.update(get_page_context(
-        Post.objects.select_related('author').all(),
-        request))
+        Post.objects.feed(),
+        request, feed=INDEX_FEED))
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
 def group_posts(request, slug):
     """Посты, отфильтрованные по группам."""
     group = get_object_or_404(Group, slug=slug)
+    tag_page(request, group_feed(group.pk))
     context = {
         'group': group,
         'title': group.title,
     }
-    context.update(get_page_context(group.posts.all(), request))
+    context.update(get_page_context(group.posts.feed(), request,
+                                    feed=group_feed(group.pk)))
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
 def profile(request, username):
-    following = False
-    author = get_object_or_404(User, username=username)
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author).exists()
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    tag_page(request, author_feed(author.pk))
     context = {
         'author': author,
-        'following': following,
     }
-    context.update(get_page_context(Post.objects.filter(author=author),
-                                    request))
+    context.update(get_page_context(author.posts.feed(),
+                                    request, feed=author_feed(author.pk)))
     return render(request, 'posts/profile.html', context)
 
 
+@replica_reads
 def post_detail(request, post_id):
-    post_item = get_object_or_404(Post, id=post_id)
-    comments = post_item.comments.all()
+    tag_page(request, post_page(post_id))
+    post_item = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id)
+    tag_page(request, author_feed(post_item.author_id),
+             *([group_feed(post_item.group_id)] if post_item.group_id
+               else []))
+    comments = get_comments_page(post_item, request.GET.get('comments'))
     comment_form = CommentForm(request.POST or None)
+    stats = getattr(post_item.author, 'stats', None)
     context = {
         'post_item': post_item,
         'text': post_item.text[:30],
-        'post_count': Post.objects.filter(author=post_item.author).count(),
+        'post_count': (stats.posts_count if stats is not None
+                       else post_item.author.posts.count()),
         'comment_form': comment_form,
         'comments': comments,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+    tag_page(request, post_page(post_id))
+    post_item = get_object_or_404(
+        Post.objects.only('comments_count'), id=post_id)
+    context = {
+        'post_item': post_item,
+        'comments': get_comments_page(post_item, request.GET.get('cursor')),
+    }
+    return render(request, 'includes/comments.html', context)
+
+
+@replica_reads
+def search(request):
+    """Посты, найденные по тексту, от самых релевантных."""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+    }
+    context.update(get_page_context(
+        Post.objects.feed().search(query), request, keys=('rank', 'pk'),
+        count_provider=PostSearch.objects.candidates(query).count))
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@accept_images
 def post_create(request):
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         post = form.save(commit=False)
         post.author = request.user
@@ -68,6 +116,7 @@ def post_create(request):
 
 
 @login_required
+@accept_images
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if request.user != post.author:
@@ -107,15 +156,13 @@ def add_comment(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
 @login_required
 def follow_index(request):
-    following = request.user.follower.values_list('author', flat=True)
     context = {
         'follow': True,
     }
-    context.update(get_page_context(
-        Post.objects.filter(author__id__in=following),
-        request))
+    context.update(follow_page_context(request))
     return render(request, 'posts/follow.html', context)
 
 
@@ -0,0 +1,6 @@
+"""Настройки проекта.
+
+yatube.settings — настройки для разработки и тестов (dev.py),
+wsgi.py по умолчанию запускается с yatube.settings.prod.
+"""
+from .dev import *  # noqa: F401,F403
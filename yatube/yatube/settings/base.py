@@ -0,0 +1,203 @@
+"""Общие настройки dev и prod.
+
+Всё, что отличается между окружениями, читается из переменных
+окружения; значения по умолчанию здесь годятся для разработки.
+"""
+import os
+
+from core.cache import cache_settings
+from core.db import database_settings
+from core.loaders import template_loaders
+
+
+def env_bool(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    return int(os.getenv(name, default))
+
+
+def env_list(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))
+
+DEBUG = False
+
+ALLOWED_HOSTS = env_list('DJANGO_ALLOWED_HOSTS', [
+    'localhost',
+    '127.0.0.1',
+    '[::1]',
+    'testserver',
+])
+
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'posts.apps.PostsConfig',
+    'users.apps.UsersConfig',
+    'core.apps.CoreConfig',
+    'about.apps.AboutConfig',
+    'sorl.thumbnail',
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.replicas.ReplicaMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'core.pagecache.PageCacheMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.profiling.TemplateProfilerMiddleware',
+]
+
+ROOT_URLCONF = 'yatube.urls'
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates/')
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [TEMPLATES_DIR],
+        'OPTIONS': {
+            'loaders': template_loaders(cached=True),
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.i18n',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+                'core.context_processors.year.year',
+            ],
+        },
+    },
+]
+
+TEMPLATE_PROFILING = False
+
+WSGI_APPLICATION = 'yatube.wsgi.application'
+
+DATABASES = database_settings(
+    os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'),
+    BASE_DIR,
+    conn_max_age=env_int('DATABASE_CONN_MAX_AGE', 0),
+    health_checks=env_bool('DATABASE_HEALTH_CHECKS'),
+    pool=os.getenv('DATABASE_POOL') or None,
+    replicas=env_list('DATABASE_REPLICA_URLS', []),
+)
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = 10
+
+REPLICA_MAX_LAG = 10
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+LANGUAGE_CODE = 'ru'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_L10N = True
+
+USE_TZ = True
+
+STATIC_URL = '/static/'
+
+STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+
+LOGIN_URL = 'users:login'
+
+LOGIN_REDIRECT_URL = 'posts:index'
+
+EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
+
+PAGE_COUNT = 10
+
+COMMENTS_PAGE_COUNT = 20
+
+FEED_COUNT_CACHE_TTL = 60
+
+FEED_CACHE_TTL = 6 * 60 * 60
+
+PAGE_CACHE = False
+
+PAGE_CACHE_TTL = 10 * 60
+
+PAGE_CACHE_MAX_AGE = 0
+
+FOLLOW_FEED_FANOUT = True
+
+FOLLOW_FEED_FANOUT_LIMIT = 1000
+
+FOLLOW_FEED_BACKFILL = 200
+
+MEDIA_URL = '/media/'
+
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+SEARCH_RANK_LIMIT = 1000
+
+POST_IMAGE_WIDTHS = [480, 960, 1440]
+
+POST_IMAGE_DEFAULT_WIDTH = 960
+
+POST_IMAGE_RATIO = 960 / 339
+
+POST_IMAGE_SIZES = '(max-width: 960px) 100vw, 960px'
+
+POST_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+
+POST_IMAGE_MAX_PIXELS = 64 * 10 ** 6
+
+POST_IMAGE_MAX_SIDE = 2880
+
+IMAGE_GC_GRACE = 24 * 60 * 60
+
+THUMBNAIL_PREGENERATE_ASYNC = True
+
+THUMBNAIL_KVSTORE = 'core.kvstore.CacheKVStore'
+
+CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+CACHES = cache_settings(
+    os.getenv('CACHE_URL', 'locmem://'),
+    key_prefix=os.getenv('CACHE_KEY_PREFIX', 'yatube'),
+)
+
+DJANGO_REDIS_LOG_IGNORED_EXCEPTIONS = True
@@ -0,0 +1,20 @@
+import os
+from copy import deepcopy
+
+from .base import *  # noqa: F401,F403
+from .base import TEMPLATES, template_loaders
+
+
+DEBUG = True
+
+SECRET_KEY = os.getenv(
+    'DJANGO_SECRET_KEY',
+    'rc$oxzfh$xwt^!nd8fo2=*nlud#lj#&&@wwo1w9!dc^4gl-s19',
+)
+
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['OPTIONS']['loaders'] = template_loaders(cached=False)
+
+TEMPLATE_PROFILING = True
+
+THUMBNAIL_PREGENERATE_ASYNC = False
@@ -0,0 +1,27 @@
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .base import *  # noqa: F401,F403
+from .base import (BASE_DIR, database_settings, env_bool, env_int,
+                   env_list)
+
+
+DEBUG = False
+
+PAGE_CACHE = env_bool('PAGE_CACHE', True)
+
+SECRET_KEY = os.getenv('DJANGO_SECRET_KEY')
+if not SECRET_KEY:
+    raise ImproperlyConfigured('Задайте переменную окружения DJANGO_SECRET_KEY')
+
+DATABASES = database_settings(
+    os.getenv('DATABASE_URL', 'sqlite:///db.sqlite3'),
+    BASE_DIR,
+    conn_max_age=env_int('DATABASE_CONN_MAX_AGE', 600),
+    health_checks=env_bool('DATABASE_HEALTH_CHECKS', True),
+    pool=os.getenv('DATABASE_POOL') or None,
+    replicas=env_list('DATABASE_REPLICA_URLS', []),
+)
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
@@ -2,7 +2,10 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
+from core.loaders import warm_up
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings.prod')
 
 application = get_wsgi_application()
+warm_up()